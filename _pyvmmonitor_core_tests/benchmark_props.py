@@ -0,0 +1,314 @@
+'''
+Benchmarks for pyvmmonitor_core.props (not run with the tests).
+
+To run:
+
+python -m _pyvmmonitor_core_tests.benchmark_props
+'''
+from __future__ import print_function
+
+import sys
+import timeit
+import tracemalloc
+
+from pyvmmonitor_core import compat
+from pyvmmonitor_core.callback import Callback
+from pyvmmonitor_core.props import PropsCustomProperty, PropsObject
+
+
+def _make_legacy_property(key, default):
+    # The implementation which kept the values in a dict per instance.
+
+    def get_val(self):
+        return self._props.get(key, default)
+
+    def set_val(self, val):
+        prev = self._props.get(key, default)
+        self._props[key] = val
+        if prev != val:
+            self._on_modified_callback(self, {key: (val, prev)})
+
+    return property(get_val, set_val)
+
+
+class LegacyPoint(object):
+
+    __slots__ = ['_props', '_on_modified_callback', '__weakref__', '_original_on_modified_callback']
+
+    x = _make_legacy_property('x', 0)
+    y = _make_legacy_property('y', 0)
+
+    def __init__(self, **kwargs):
+        self._props = {}
+        self._original_on_modified_callback = self._on_modified_callback = Callback()
+        for key, val in compat.iteritems(kwargs):
+            setattr(self, key, val)
+
+    def register_modified(self, on_modified):
+        self._original_on_modified_callback.register(on_modified)
+
+
+class Point(PropsObject):
+
+    PropsObject.declare_props(x=0, y=0)
+
+
+def measure_memory(factory, count):
+    '''
+    :return int:
+        The number of bytes allocated by each object created by the factory.
+    '''
+    tracemalloc.start()
+    try:
+        initial = tracemalloc.get_traced_memory()[0]
+        objects = [factory() for _i in compat.xrange(count)]
+        final = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(objects) == count
+    return (final - initial) / float(count)
+
+
+def measure_time(stmt, namespace, number=1000000, repeat=5):
+    '''
+    :return float:
+        The time (in nanoseconds) for each execution of the statement (the best of the repeats
+        is used).
+    '''
+    number = max(1, number // repeat)
+    return min(timeit.repeat(stmt, globals=namespace, number=number, repeat=repeat)) / number * 1e9
+
+
+def print_result(name, legacy, current, unit, labels=('legacy', 'current')):
+    print('%-40s %s: %10.1f %s   %s: %10.1f %s' % (
+        name, labels[0], legacy, unit, labels[1], current, unit))
+
+
+def bench_storage():
+    count = 100000
+    print_result(
+        'memory per point (x, y set)',
+        measure_memory(lambda: LegacyPoint(x=1, y=2), count),
+        measure_memory(lambda: Point(x=1, y=2), count),
+        'bytes')
+
+    print_result(
+        'create point (x, y set)',
+        measure_time('LegacyPoint(x=1, y=2)', globals(), number=200000),
+        measure_time('Point(x=1, y=2)', globals(), number=200000),
+        'ns')
+
+    legacy = LegacyPoint(x=1)
+    current = Point(x=1)
+    for name, stmt in (
+            ('get (set value)', 'p.x'),
+            ('get (default value)', 'p.y'),
+            ('set (same value)', 'p.x = 1'),
+            ('set (changed value)', 'p.x = -p.x')):
+        print_result(
+            name,
+            measure_time(stmt, {'p': legacy}),
+            measure_time(stmt, {'p': current}),
+            'ns')
+
+    def on_modified(obj, attrs):
+        pass
+
+    for p in (legacy, current):
+        p.register_modified(on_modified)
+    for name, stmt in (
+            ('set observed (same value)', 'p.x = 1'),
+            ('set observed (changed value)', 'p.x = -p.x')):
+        print_result(
+            name,
+            measure_time(stmt, {'p': legacy}),
+            measure_time(stmt, {'p': current}),
+            'ns')
+
+
+class Buffers(PropsObject):
+
+    PropsObject.declare_props(
+        by_equality=None,
+        by_identity=PropsCustomProperty(None, compare='identity'),
+    )
+
+
+def bench_compare():
+    buffers = Buffers()
+
+    def on_modified(obj, attrs):
+        pass
+
+    buffers.register_modified(on_modified)
+    values = [list(range(1000000)) for _i in range(2)]
+    namespace = {'b': buffers, 'values': values}
+    print_result(
+        'set observed 1M items list',
+        measure_time('b.by_equality = values[0]; b.by_equality = values[1]', namespace, 100) / 2,
+        measure_time('b.by_identity = values[0]; b.by_identity = values[1]', namespace, 100) / 2,
+        'ns',
+        labels=('equality', 'identity'))
+
+
+def bench_clone():
+    import pickle
+    from pyvmmonitor_core.props import clone_many, dumps_many, loads_many
+
+    points = [Point(x=i, y=i * 2) for i in compat.xrange(100000)]
+
+    def copy_with_dicts():
+        return [Point(**p.get_props_as_dict()) for p in points]
+
+    def pickle_with_dicts():
+        data = pickle.dumps([p.get_props_as_dict() for p in points], pickle.HIGHEST_PROTOCOL)
+        return [Point(**d) for d in pickle.loads(data)]
+
+    def pickle_points():
+        return pickle.loads(pickle.dumps(points, pickle.HIGHEST_PROTOCOL))
+
+    def measure(func):
+        return min(timeit.repeat(func, number=1, repeat=3)) * 1e3
+
+    print_result(
+        'copy 100k points',
+        measure(copy_with_dicts),
+        measure(lambda: clone_many(points)),
+        'ms',
+        labels=('dicts', 'clone_many'))
+
+    print_result(
+        'pickle dumps/loads 100k points',
+        measure(pickle_with_dicts),
+        measure(pickle_points),
+        'ms',
+        labels=('dicts', 'pickle'))
+
+    print_result(
+        'pickle dumps/loads 100k points',
+        measure(pickle_with_dicts),
+        measure(lambda: loads_many(dumps_many(points))),
+        'ms',
+        labels=('dicts', 'dumps_many'))
+
+
+def bench_journal():
+    import os
+    import tempfile
+    from pyvmmonitor_core.props_journal import PropsJournalRecorder, get_index_path
+
+    def on_modified(obj, attrs):
+        pass
+
+    observed = Point(x=1)
+    observed.register_modified(on_modified)
+    recorded = Point(x=1)
+    path = os.path.join(tempfile.mkdtemp(), 'benchmark.journal')
+    recorder = PropsJournalRecorder(path)
+    recorder.track(recorded)
+    try:
+        print_result(
+            'set changed value (recorded)',
+            measure_time('p.x = -p.x', {'p': observed}, 200000),
+            measure_time('p.x = -p.x', {'p': recorded}, 200000),
+            'ns',
+            labels=('observed', 'recorded'))
+    finally:
+        recorder.close()
+        print('%-40s %.1f bytes per change' % ('journal size', os.path.getsize(path) / 200000.))
+        os.remove(path)
+        os.remove(get_index_path(path))
+
+
+def bench_collection():
+    try:
+        import numpy
+    except ImportError:
+        print('NumPy not available: skipping PropsCollection benchmark.')
+        return
+
+    from pyvmmonitor_core.props_collection import PropsCollection
+
+    count = 200000
+
+    def on_modified(*args):
+        pass
+
+    points = [Point() for _i in compat.xrange(count)]
+    for p in points:
+        p.register_modified(on_modified)
+    xs = numpy.arange(count, dtype=float)
+
+    def set_objects():
+        for p, x in compat.izip(points, xs):
+            p.x = x
+
+    collection = PropsCollection(Point, count)
+    collection.register_modified(on_modified)
+
+    def set_collection():
+        collection.set_values('x', xs)
+
+    print_result(
+        'set x in 200k points',
+        timeit.timeit(set_objects, number=1) * 1e3,
+        timeit.timeit(set_collection, number=1) * 1e3,
+        'ms',
+        labels=('objects', 'collection'))
+
+
+def _measure_history_memory(record, points, steps):
+    tracemalloc.start()
+    try:
+        initial = tracemalloc.get_traced_memory()[0]
+        history = record(points, steps)
+        final = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert history is not None
+    return (final - initial) / 1024.
+
+
+def _record_mementos(points, steps):
+    # Keep a memento of the object changed in each step.
+    history = []
+    for i in compat.xrange(steps):
+        p = points[i % len(points)]
+        p.x = i + 1
+        history.append((p, p.create_memento()))
+    return history
+
+
+def _record_journal(points, steps):
+    from pyvmmonitor_core.props_undo import PropsUndoJournal
+
+    journal = PropsUndoJournal()
+    for p in points:
+        journal.track(p)
+    for i in compat.xrange(steps):
+        points[i % len(points)].x = i + 1
+    return journal
+
+
+def bench_undo():
+    steps = 10000
+    print_result(
+        'history of 10k steps (100 points)',
+        _measure_history_memory(_record_mementos, [Point(x=0, y=1) for _i in range(100)], steps),
+        _measure_history_memory(_record_journal, [Point(x=0, y=1) for _i in range(100)], steps),
+        'KB',
+        labels=('mementos', 'journal'))
+
+
+def main():
+    print('Python: %s' % (sys.version.split()[0],))
+    bench_storage()
+    bench_compare()
+    bench_clone()
+    bench_journal()
+    bench_collection()
+    bench_undo()
+
+
+if __name__ == '__main__':
+    main()
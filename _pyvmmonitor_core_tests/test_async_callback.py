@@ -0,0 +1,108 @@
+import asyncio
+import sys
+
+from pyvmmonitor_core.async_callback import AsyncCallback
+from pyvmmonitor_core.weak_utils import get_weakref
+
+
+def test_async_callback_concurrent():
+    c = AsyncCallback()
+    running = []
+    max_running = []
+    called = []
+
+    async def on_event(arg):
+        running.append(arg)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(arg)
+
+    async def on_event2(arg):
+        await on_event(arg + 1)
+
+    def on_sync(arg):
+        called.append(arg)
+
+    c.register(on_event)
+    c.register(on_event2)
+    c.register(on_sync)
+
+    async def main():
+        future = c(1)
+        # Plain functions are called inline.
+        assert called == [1]
+        await future
+
+    asyncio.run(main())
+    assert max(max_running) == 2
+    assert running == []
+
+
+def test_async_callback_max_concurrency():
+    c = AsyncCallback(max_concurrency=1)
+    running = []
+    max_running = []
+
+    class F(object):
+
+        async def on_event(self, arg):
+            running.append(arg)
+            max_running.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(arg)
+
+    f1 = F()
+    f2 = F()
+    c.register(f1.on_event)
+    c.register(f2.on_event)
+
+    asyncio.run(_emit(c, 1))
+    assert max_running == [1, 1]
+
+    f1 = get_weakref(f1)
+    assert f1() is None
+    asyncio.run(_emit(c, 1))
+    assert len(c) == 1
+
+
+def test_async_callback_errors(monkeypatch):
+    c = AsyncCallback()
+    errors = []
+    called = []
+
+    def on_error(exc_type, exc, tb):
+        errors.append(exc_type)
+
+    monkeypatch.setattr(sys, 'excepthook', on_error)
+
+    async def on_async_error():
+        raise RuntimeError()
+
+    def on_sync_error():
+        raise ValueError()
+
+    async def on_event():
+        called.append(1)
+
+    c.register(on_async_error)
+    c.register(on_sync_error)
+    c.register(on_event)
+    asyncio.run(_emit(c))
+    assert called == [1]
+    assert sorted(errors, key=lambda e: e.__name__) == [RuntimeError, ValueError]
+
+
+def test_async_callback_no_coroutines():
+    c = AsyncCallback()
+    called = []
+
+    def on_event(arg):
+        called.append(arg)
+
+    c.register(on_event)
+    asyncio.run(_emit(c, 1))
+    assert called == [1]
+
+
+async def _emit(callback, *args):
+    await callback(*args)
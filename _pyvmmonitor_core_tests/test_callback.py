@@ -62,3 +62,107 @@ def test_callback3():
     del strong_ref_to_method
     c(1)
     assert len(c) == 1
+
+
+def test_callback_priority():
+    c = Callback()
+    called = []
+
+    def make_func(name):
+
+        def func():
+            called.append(name)
+
+        return func
+
+    f1 = make_func('f1')
+    f2 = make_func('f2')
+    invalidate_cache = make_func('invalidate_cache')
+    before_all = make_func('before_all')
+    after_all = make_func('after_all')
+
+    c.register(f1)
+    c.register(f2)
+    c.register(invalidate_cache, priority=10)
+    c.register(before_all, priority=20)
+    c.register(after_all, priority=-1)
+    c()
+    assert called == ['before_all', 'invalidate_cache', 'f1', 'f2', 'after_all']
+
+    # Re-registering updates the priority.
+    del called[:]
+    c.register(before_all)
+    c()
+    assert called == ['invalidate_cache', 'f1', 'f2', 'before_all', 'after_all']
+
+    del called[:]
+    c.unregister(invalidate_cache)
+    c()
+    assert called == ['f1', 'f2', 'before_all', 'after_all']
+
+
+def test_callback_once():
+    c = Callback()
+    called = []
+
+    class F(object):
+
+        def on_call(self, arg):
+            called.append(('once', arg))
+
+    def on_call(arg):
+        called.append(('always', arg))
+
+    f = F()
+    c.register(f.on_call, once=True)
+    c.register(on_call)
+    assert len(c) == 2
+
+    c(1)
+    c(2)
+    assert called == [('once', 1), ('always', 1), ('always', 2)]
+    assert len(c) == 1
+
+    # Registering again without once keeps it registered.
+    c.register(f.on_call, once=True)
+    c.register(f.on_call)
+    c(3)
+    c(4)
+    assert called[3:] == [('always', 3), ('once', 3), ('always', 4), ('once', 4)]
+
+
+def test_callback_owner():
+    c = Callback()
+    called = []
+
+    class Owner(object):
+        pass
+
+    owner = Owner()
+    other_owner = Owner()
+
+    def register_closure(name, owner):
+        c.register(lambda: called.append(name), owner=owner)
+
+    register_closure('closure1', owner)
+    register_closure('closure2', other_owner)
+    c()
+    assert called == ['closure1', 'closure2']
+    assert len(c) == 2
+
+    owner = get_weakref(owner)
+    assert owner() is None
+    assert len(c) == 1
+    c()
+    assert called == ['closure1', 'closure2', 'closure2']
+
+    # Explicitly unregistering also works (and the owner collection is a no-op afterwards).
+    def func():
+        called.append('func')
+
+    c.register(func, owner=other_owner)
+    c.unregister(func)
+    assert len(c) == 1
+    other_owner = get_weakref(other_owner)
+    assert other_owner() is None
+    assert len(c) == 0
@@ -0,0 +1,106 @@
+import logging
+import time
+
+import pytest
+
+from pyvmmonitor_core.callback import Callback
+from pyvmmonitor_core.callback_profiler import CallbackProfiler
+
+
+class _Listener(object):
+
+    def __init__(self, sleep):
+        self.sleep = sleep
+        self.called = []
+
+    def on_event(self, arg):
+        self.called.append(arg)
+        if self.sleep:
+            time.sleep(self.sleep)
+
+
+def test_callback_profiler():
+    c = Callback()
+    fast = _Listener(0)
+    slow = _Listener(0.02)
+    c.register(fast.on_event)
+    c.register(slow.on_event)
+
+    slow_found = []
+
+    def on_slow(callback, func, elapsed):
+        slow_found.append((callback, func, elapsed))
+
+    profiler = CallbackProfiler(slow_threshold=0.01, on_slow=on_slow)
+    profiler.install(c)
+    assert c.__class__ is not Callback
+    assert isinstance(c, Callback)
+
+    c(1)
+    c(2)
+    assert fast.called == [1, 2]
+    assert slow.called == [1, 2]
+
+    stats = profiler.get_stats(c)
+    assert [s.name for s in stats] == ['_Listener.on_event', '_Listener.on_event']
+    assert [s.count for s in stats] == [2, 2]
+    assert stats[0].total_time >= 0.04
+    assert stats[0].max_time >= 0.02
+    assert stats[0].total_time > stats[1].total_time
+
+    assert len(slow_found) == 2
+    assert slow_found[0][0] is c
+    assert slow_found[0][1] == slow.on_event
+
+    profiler.uninstall(c)
+    assert c.__class__ is Callback
+    c(3)
+    assert profiler.get_stats(c)[0].count == 2
+    assert fast.called == [1, 2, 3]
+
+
+def test_callback_profiler_log(caplog):
+    c = Callback()
+    slow = _Listener(0.02)
+    c.register(slow.on_event)
+
+    profiler = CallbackProfiler(slow_threshold=0.01)
+    profiler.install(c)
+    with caplog.at_level(logging.WARNING):
+        c(1)
+    assert 'Slow callback listener: _Listener.on_event' in caplog.text
+
+
+def test_callback_profiler_subclasses():
+    from pyvmmonitor_core.coalescing_callback import CoalescingCallback
+    from pyvmmonitor_core.props import PropsObject
+
+    class MyProps(PropsObject):
+        PropsObject.declare_props(a=10)
+
+    profiler = CallbackProfiler()
+
+    c = CoalescingCallback()
+    listener = _Listener(0)
+    c.register(listener.on_event)
+    profiler.install(c)
+    assert isinstance(c, CoalescingCallback)
+    c(1)
+    c(2)
+    c.flush()
+    assert listener.called == [2]
+    assert [s.count for s in profiler.get_stats(c)] == [1]
+    profiler.uninstall(c)
+    assert c.__class__ is CoalescingCallback
+
+    p = MyProps()
+    modified = []
+    p.register_modified(lambda obj, attrs: modified.append(attrs))
+    profiler.install(p._on_modified_callback)
+    p.a = 1
+    p.a = 2
+    assert modified == [{'a': (1, 10)}, {'a': (2, 1)}]
+    assert [s.count for s in profiler.get_stats(p._on_modified_callback)] == [2]
+
+    with pytest.raises(TypeError):
+        profiler.install(object())
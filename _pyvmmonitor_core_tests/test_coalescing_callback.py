@@ -0,0 +1,147 @@
+import pytest
+
+from pyvmmonitor_core.coalescing_callback import (CoalescingCallback,
+                                                  merge_accumulate,
+                                                  merge_modified)
+from pyvmmonitor_core.props import PropsObject
+
+
+def test_coalescing_callback_last():
+    c = CoalescingCallback()
+    called = []
+
+    def on_event(*args, **kwargs):
+        called.append((args, kwargs))
+
+    c.register(on_event)
+    c(1)
+    c(2, a=3)
+    assert called == []
+    assert c.has_pending()
+    c.flush()
+    assert called == [((2,), {'a': 3})]
+    assert not c.has_pending()
+    c.flush()
+    assert len(called) == 1
+
+
+def test_coalescing_callback_accumulate():
+    c = CoalescingCallback(merge=merge_accumulate)
+    called = []
+
+    def on_event(events):
+        called.append(events)
+
+    c.register(on_event)
+    c(1)
+    c(2, 3)
+    c.flush()
+    assert called == [[(1,), (2, 3)]]
+
+    with pytest.raises(TypeError):
+        c(a=1)
+
+
+def test_coalescing_callback_schedule():
+    scheduled = []
+
+    def schedule(delay, func):
+        scheduled.append((delay, func))
+
+    c = CoalescingCallback(window=0.5, schedule=schedule)
+    called = []
+
+    def on_event(arg):
+        called.append(arg)
+
+    c.register(on_event)
+    c(1)
+    c(2)
+    assert len(scheduled) == 1
+    delay, func = scheduled.pop()
+    assert delay == 0.5
+    func()
+    assert called == [2]
+
+    c.discard_pending()
+    c(3)
+    c.discard_pending()
+    assert len(scheduled) == 1
+    scheduled.pop()[1]()
+    assert called == [2]
+
+
+def test_coalescing_callback_schedule_after_cancel():
+
+    class MyProps(PropsObject):
+        PropsObject.declare_props(a=10)
+
+    scheduled = []
+
+    def schedule(delay, func):
+        scheduled.append(func)
+
+    c = CoalescingCallback(merge=merge_modified, window=0.5, schedule=schedule)
+    called = []
+
+    def on_modified(obj, attrs):
+        called.append(attrs)
+
+    c.register(on_modified)
+    p = MyProps()
+    p.register_modified(c)
+    p.a = 1
+    p.a = 10  # Cancels the pending emit.
+    assert not c.has_pending()
+
+    p.a = 2
+    assert len(scheduled) == 2
+    stale, current = scheduled
+
+    # The flush scheduled for the cancelled burst is ignored.
+    stale()
+    assert called == []
+    assert c.has_pending()
+
+    current()
+    assert called == [{'a': (2, 10)}]
+
+
+def test_coalescing_callback_window_without_schedule():
+    c = CoalescingCallback(window=0)
+    called = []
+
+    def on_event(arg):
+        called.append(arg)
+
+    c.register(on_event)
+    c(1)
+    assert called == []
+    c(2)  # Window elapsed: delivered.
+    assert called == [2]
+
+
+def test_coalescing_callback_props():
+
+    class MyProps(PropsObject):
+        PropsObject.declare_props(a=10, b=20)
+
+    c = CoalescingCallback(merge=merge_modified)
+    called = []
+
+    def on_modified(obj, attrs):
+        called.append((obj, attrs))
+
+    c.register(on_modified)
+
+    p = MyProps()
+    p.register_modified(c)
+    p.a = 1
+    p.b = 2
+    p.a = 3
+    c.flush()
+    assert called == [(p, {'a': (3, 10), 'b': (2, 20)})]
+
+    p.a = 4
+    p.a = 3
+    assert not c.has_pending()
@@ -0,0 +1,80 @@
+import pytest
+
+from pyvmmonitor_core import dotpath
+from pyvmmonitor_core.event_bus import EventBus
+from pyvmmonitor_core.weak_utils import get_weakref
+
+
+def test_dotpath_split_join():
+    assert dotpath.split('a.b.c') == ['a', 'b', 'c']
+    assert dotpath.split('') == []
+    assert dotpath.join('a', 'b.c', '') == 'a.b.c'
+
+
+def test_event_bus():
+    bus = EventBus()
+    called = []
+
+    def on_exact(topic, value):
+        called.append(('exact', topic, value))
+
+    def on_any_part(topic, value):
+        called.append(('any_part', topic, value))
+
+    def on_any_parts(topic, value):
+        called.append(('any_parts', topic, value))
+
+    bus.subscribe('process.10.cpu', on_exact)
+    bus.subscribe('process.*.cpu', on_any_part)
+    bus.subscribe('process.**', on_any_parts)
+
+    bus.publish('process.10.cpu', 1)
+    assert sorted(called) == [
+        ('any_part', 'process.10.cpu', 1),
+        ('any_parts', 'process.10.cpu', 1),
+        ('exact', 'process.10.cpu', 1),
+    ]
+
+    del called[:]
+    bus.publish('process.20.cpu', 2)
+    assert sorted(called) == [
+        ('any_part', 'process.20.cpu', 2),
+        ('any_parts', 'process.20.cpu', 2),
+    ]
+
+    del called[:]
+    bus.publish('process.20.memory', 3)
+    bus.publish('process', 4)
+    bus.publish('other.20.cpu', 5)
+    assert called == [('any_parts', 'process.20.memory', 3)]
+
+    bus.unsubscribe('process.10.cpu', on_exact)
+    bus.unsubscribe('process.*.cpu', on_any_part)
+    assert bus.has_subscriptions()
+    bus.unsubscribe('process.**', on_any_parts)
+    assert not bus.has_subscriptions()
+
+    with pytest.raises(ValueError):
+        bus.subscribe('process.**.cpu', on_exact)
+
+
+def test_event_bus_weak():
+    bus = EventBus()
+
+    class F(object):
+
+        def __init__(self):
+            self.called = []
+
+        def on_event(self, topic):
+            self.called.append(topic)
+
+    f = F()
+    bus.subscribe('a.b', f.on_event)
+    bus.publish('a.b')
+    assert f.called == ['a.b']
+
+    f = get_weakref(f)
+    assert f() is None
+    bus.publish('a.b')
+    assert not bus.has_subscriptions()
@@ -0,0 +1,74 @@
+import threading
+
+from pyvmmonitor_core.main_thread_callback import (MainThreadMarshaler,
+                                                   MarshaledCallback)
+
+
+def _emit_in_thread(func):
+    t = threading.Thread(target=func)
+    t.start()
+    t.join()
+
+
+def test_marshaled_callback():
+    wakeups = []
+    marshaler = MainThreadMarshaler(wakeups.append)
+    c = MarshaledCallback(marshaler)
+    called = []
+
+    def on_event(arg):
+        called.append((arg, threading.current_thread().name))
+
+    c.register(on_event)
+
+    c(0)
+    assert called == [(0, 'MainThread')]
+    del called[:]
+
+    def emit():
+        for i in range(10):
+            c(i)
+
+    _emit_in_thread(emit)
+    assert called == []
+    assert len(wakeups) == 1
+    assert len(marshaler) == 10
+
+    wakeups.pop()()
+    assert called == [(i, 'MainThread') for i in range(10)]
+    assert len(marshaler) == 0
+
+    # Flushing without pending emits is a no-op.
+    marshaler.flush()
+    assert len(called) == 10
+
+
+def test_marshaled_callback_coalesce():
+    wakeups = []
+    marshaler = MainThreadMarshaler(wakeups.append)
+    c1 = MarshaledCallback(marshaler, coalesce=True)
+    c2 = MarshaledCallback(marshaler, coalesce=True)
+    c3 = MarshaledCallback(marshaler)
+    called = []
+
+    def on_event(arg):
+        called.append(arg)
+
+    c1.register(on_event)
+    c2.register(on_event)
+    c3.register(on_event)
+
+    def emit():
+        for i in range(5):
+            c1(('c1', i))
+            c2(('c2', i))
+            c3(('c3', i))
+
+    _emit_in_thread(emit)
+    assert len(wakeups) == 1
+    wakeups.pop()()
+    assert called == [('c3', 0), ('c3', 1), ('c3', 2), ('c3', 3), ('c1', 4), ('c2', 4), ('c3', 4)]
+
+    # A new burst asks for a new wakeup.
+    _emit_in_thread(emit)
+    assert len(wakeups) == 1
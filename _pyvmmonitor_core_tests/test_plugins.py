@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 
 from pyvmmonitor_core.callback import Callback
@@ -122,3 +124,272 @@ def test_inject_class():
 
     assert m1(pm=pm)[0] == pm.get_instance(EPFoo)
     assert len(m1(pm=pm)[1]) == 2
+
+
+def test_plugins_preload():
+    from concurrent.futures import ThreadPoolExecutor
+
+    pm = PluginManager()
+    pm.register(EPFoo, '_pyvmmonitor_core_tests.test_plugins.FooImpl', keep_instance=True)
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.AnotherFooImpl')
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.NotThere')
+
+    futures = pm.preload(eps=['EPFoo'])
+    assert [f.result() for f in futures] == [FooImpl]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = pm.preload(executor=executor)
+        results = []
+        for f in futures:
+            try:
+                results.append(f.result())
+            except ImportError:
+                results.append(None)
+    assert results == [AnotherFooImpl, FooImpl, None]
+
+    with pytest.raises(ImportError):
+        pm.get_implementations(EPBar)
+
+
+def test_plugins_classes_cached():
+    pm = PluginManager()
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.AnotherFooImpl')
+    assert [i.__class__ for i in pm.get_implementations(EPBar)] == [AnotherFooImpl]
+
+    # The class is resolved only once.
+    pm._impl_to_class['_pyvmmonitor_core_tests.test_plugins.AnotherFooImpl'] = FooImpl
+    assert [i.__class__ for i in pm.get_implementations(EPBar)] == [FooImpl]
+
+
+class SlowImpl(EPFoo):
+
+    created = []
+
+    def __init__(self):
+        import time
+        time.sleep(.05)
+        SlowImpl.created.append(self)
+
+
+def test_plugins_get_instance_threads():
+    pm = PluginManager()
+    pm.register(EPFoo, '_pyvmmonitor_core_tests.test_plugins.SlowImpl', keep_instance=True)
+    del SlowImpl.created[:]
+
+    found = []
+
+    def get_instance():
+        found.append(pm.get_instance(EPFoo))
+
+    threads = [threading.Thread(target=get_instance) for _i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(SlowImpl.created) == 1
+    assert found == SlowImpl.created * 5
+    assert pm.get_instance(EPFoo) is found[0]
+
+
+class EPBaz(object):
+    pass
+
+
+class _Recorder(object):
+
+    events = []
+
+    def __init__(self):
+        self.events.append(('init', self.__class__.__name__))
+
+    def plugins_exit(self):
+        self.events.append(('exit', self.__class__.__name__))
+
+
+class BazImpl(_Recorder):
+    plugins_depends = ()
+
+
+class BarDependsOnBaz(_Recorder):
+    plugins_depends = (EPBaz,)
+
+
+class FooDependsOnBarAndBaz(_Recorder):
+    plugins_depends = ('EPBar', EPBaz)
+
+
+class BazDependsOnFoo(_Recorder):
+    plugins_depends = (EPFoo,)
+
+
+def _register_dependent_plugins(pm):
+    pm.register(
+        EPFoo, '_pyvmmonitor_core_tests.test_plugins.FooDependsOnBarAndBaz', keep_instance=True)
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.BarDependsOnBaz', keep_instance=True)
+    pm.register(EPBaz, '_pyvmmonitor_core_tests.test_plugins.BazImpl', keep_instance=True)
+
+
+@pytest.mark.parametrize('max_workers', [None, 2])
+def test_plugins_dependencies(max_workers):
+    del _Recorder.events[:]
+    pm = PluginManager()
+    _register_dependent_plugins(pm)
+
+    instances = pm.init_instances(max_workers=max_workers)
+    assert [i.__class__ for i in instances] == [BazImpl, BarDependsOnBaz, FooDependsOnBarAndBaz]
+    assert _Recorder.events == [
+        ('init', 'BazImpl'), ('init', 'BarDependsOnBaz'), ('init', 'FooDependsOnBarAndBaz')]
+
+    del _Recorder.events[:]
+    pm.exit(max_workers=max_workers, timeout=5 if max_workers else None)
+    assert _Recorder.events == [
+        ('exit', 'FooDependsOnBarAndBaz'), ('exit', 'BarDependsOnBaz'), ('exit', 'BazImpl')]
+
+
+def test_plugins_dependencies_subset_and_cycle():
+    del _Recorder.events[:]
+    pm = PluginManager()
+    _register_dependent_plugins(pm)
+    assert [i.__class__ for i in pm.init_instances(eps=['EPBar'])] == [
+        BazImpl, BarDependsOnBaz]
+
+    pm = PluginManager()
+    pm.register(
+        EPFoo, '_pyvmmonitor_core_tests.test_plugins.FooDependsOnBarAndBaz', keep_instance=True)
+    pm.register(EPBaz, '_pyvmmonitor_core_tests.test_plugins.BazDependsOnFoo', keep_instance=True)
+    with pytest.raises(RuntimeError):
+        pm.init_instances()
+
+    # On exit the cycle is just logged.
+    pm.get_instance(EPFoo)
+    pm.get_instance(EPBaz)
+    del _Recorder.events[:]
+    pm.exit()
+    assert sorted(_Recorder.events) == [
+        ('exit', 'BazDependsOnFoo'), ('exit', 'FooDependsOnBarAndBaz')]
+
+
+class _SlowExit(object):
+
+    def plugins_exit(self):
+        import time
+        time.sleep(1)
+
+
+def test_plugins_exit_timeout():
+    import time
+    pm = PluginManager()
+    pm.set_instance(EPFoo, _SlowExit())
+    initial = time.time()
+    pm.exit(timeout=.1)
+    assert time.time() - initial < .9
+    assert pm.exited
+
+
+class _SleepExit(_Recorder):
+
+    def plugins_exit(self):
+        import time
+        time.sleep(.3)
+        _Recorder.plugins_exit(self)
+
+
+def test_plugins_exit_timeout_per_call():
+    pm = PluginManager()
+    for ep in (EPFoo, EPBar, EPBaz):
+        pm.set_instance(ep, _SleepExit())
+    del _Recorder.events[:]
+
+    # The timeout is for each call (not for all the calls done in a single thread).
+    pm.exit(timeout=.5)
+    assert _Recorder.events == [('exit', '_SleepExit')] * 3
+
+
+_hang_exit = threading.Event()
+
+
+class _HangExit(_Recorder):
+
+    plugins_depends = (EPBaz,)
+
+    def plugins_exit(self):
+        _hang_exit.wait(5)
+        _Recorder.plugins_exit(self)
+
+
+class _BazExit(_Recorder):
+    plugins_depends = ()
+
+
+def test_plugins_exit_timeout_hang():
+    import time
+    _hang_exit.clear()
+    pm = PluginManager()
+    pm.set_instance(EPFoo, _HangExit())
+    pm.set_instance(EPBar, BazImpl())
+    pm.set_instance(EPBaz, _BazExit())
+    del _Recorder.events[:]
+
+    initial = time.time()
+    try:
+        # A call which hangs doesn't prevent the other calls in its level or the calls in the
+        # next levels (which only start after it times out).
+        pm.exit(timeout=.2)
+        assert time.time() - initial < 2
+        assert _Recorder.events == [('exit', 'BazImpl'), ('exit', '_BazExit')]
+    finally:
+        _hang_exit.set()
+
+
+def test_inject_cached():
+    from pyvmmonitor_core.plugins import inject
+
+    pm = PluginManager()
+    pm.register(EPFoo, '_pyvmmonitor_core_tests.test_plugins.FooImpl', keep_instance=True)
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.AnotherFooImpl')
+
+    @inject(__cache__=True, foo=EPFoo, bars=[EPBar])
+    def m1(foo, bars, pm):
+        return foo, bars
+
+    foo, bars = m1(pm=pm)
+    assert foo is pm.get_instance(EPFoo)
+    assert m1(pm=pm)[0] is foo
+    bars2 = m1(pm=pm)[1]
+    assert bars2 == bars and bars2 is not bars
+    assert m1(pm=pm, foo=1)[0] == 1
+
+    # Registering something invalidates the cache.
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.FooImpl')
+    assert [b.__class__ for b in m1(pm=pm)[1]] == [AnotherFooImpl, FooImpl]
+
+    # Other plugin managers have their own cache.
+    pm2 = PluginManager()
+    pm2.register(EPFoo, '_pyvmmonitor_core_tests.test_plugins.FooImpl', keep_instance=True)
+    pm2.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.AnotherFooImpl')
+    assert m1(pm=pm2)[0] is pm2.get_instance(EPFoo)
+    assert m1(pm=pm)[0] is foo
+
+    pm.exit()
+    with pytest.raises(AssertionError):
+        m1(pm=pm)
+
+
+def test_inject_cached_doesnt_keep_instances_alive():
+    import gc
+    import weakref
+    from pyvmmonitor_core.plugins import inject
+
+    @inject(__cache__=True, foo=EPFoo)
+    def m1(foo, pm):
+        return foo
+
+    pm = PluginManager()
+    pm.register(EPFoo, '_pyvmmonitor_core_tests.test_plugins.FooImpl', keep_instance=True)
+    foo_ref = weakref.ref(m1(pm=pm))
+    assert foo_ref() is not None
+
+    del pm
+    gc.collect()
+    assert foo_ref() is None
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from pyvmmonitor_core.plugins import AsyncOnlyPluginError, PluginManager
+
+
+class EPServer(object):
+    pass
+
+
+class EPClient(object):
+    pass
+
+
+class ServerImpl(EPServer):
+
+    created = []
+
+    def __init__(self, port):
+        self.port = port
+
+    @classmethod
+    async def plugins_acreate(cls, port):
+        await asyncio.sleep(.01)
+        ret = cls(port)
+        cls.created.append(ret)
+        return ret
+
+
+class ClientImpl(EPClient):
+
+    plugins_depends = (EPServer,)
+
+
+def _create_pm():
+    pm = PluginManager()
+    pm.register(
+        EPServer, '_pyvmmonitor_core_tests.test_plugins_async.ServerImpl', kwargs={'port': 22},
+        keep_instance=True)
+    pm.register(
+        EPClient, '_pyvmmonitor_core_tests.test_plugins_async.ClientImpl', keep_instance=True)
+    return pm
+
+
+def test_plugins_aget_instance():
+    del ServerImpl.created[:]
+    pm = _create_pm()
+
+    with pytest.raises(AsyncOnlyPluginError):
+        pm.get_instance(EPServer)
+    assert pm.has_instance(EPServer)
+
+    async def main():
+        # Created only once even if requested concurrently.
+        return await asyncio.gather(*[pm.aget_instance('EPServer') for _i in range(3)])
+
+    servers = asyncio.run(main())
+    assert ServerImpl.created == servers[:1]
+    assert servers == servers[:1] * 3
+    assert servers[0].port == 22
+    assert servers[0].pm() is pm
+
+    # Once created it's also available through get_instance.
+    assert pm.get_instance(EPServer) is servers[0]
+
+    # Regular implementations also work.
+    client = asyncio.run(pm.aget_instance(EPClient))
+    assert pm.get_instance(EPClient) is client
+    assert not pm._async_creating
+
+
+def test_plugins_ainit_instances():
+    pm = _create_pm()
+    instances = asyncio.run(pm.ainit_instances())
+    assert [i.__class__ for i in instances] == [ServerImpl, ClientImpl]
@@ -0,0 +1,132 @@
+import sys
+import threading
+
+import pytest
+
+from pyvmmonitor_core.plugins import NotInstanceError, PluginManager
+from pyvmmonitor_core.plugins_manifest import (create_manifest,
+                                               is_manifest_stale, main)
+
+_REGISTER_MODULE = '''
+def register(pm):
+    from _pyvmmonitor_core_tests.test_plugins import EPBar, EPFoo
+    pm.register(EPFoo, '_pyvmmonitor_core_tests.test_plugins.FooImpl', keep_instance=True)
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.AnotherFooImpl')
+    pm.register(EPBar, '_pyvmmonitor_core_tests.test_plugins.FooImpl')
+'''
+
+
+@pytest.fixture
+def register_module(tmpdir):
+    module_file = tmpdir.join('_plugins_manifest_register.py')
+    module_file.write(_REGISTER_MODULE)
+    sys.path.insert(0, str(tmpdir))
+    try:
+        yield module_file
+    finally:
+        sys.path.remove(str(tmpdir))
+        sys.modules.pop('_plugins_manifest_register', None)
+
+
+def test_plugins_manifest(tmpdir, register_module):
+    from _pyvmmonitor_core_tests.test_plugins import (AnotherFooImpl, EPBar,
+                                                      FooImpl)
+    manifest_path = str(tmpdir.join('manifest.json'))
+    assert is_manifest_stale(manifest_path)
+
+    assert main(['_plugins_manifest_register.register', manifest_path]) == 0
+    assert not is_manifest_stale(manifest_path)
+
+    pm = PluginManager()
+    pm.load_manifest(manifest_path)
+    assert not pm._ep_to_impls  # Only registered when requested.
+
+    assert isinstance(pm.get_instance('EPFoo'), FooImpl)
+    assert [i.__class__ for i in pm.get_implementations(EPBar)] == [AnotherFooImpl, FooImpl]
+    assert not pm._manifest_ep_path_to_registrations
+    with pytest.raises(NotInstanceError):
+        pm.get_instance(EPBar)
+
+    # Changing a module imported to do the registrations makes it stale.
+    register_module.write(_REGISTER_MODULE + '\n# Changed\n')
+    assert is_manifest_stale(manifest_path)
+
+
+def test_plugins_manifest_preload(tmpdir, register_module):
+    manifest_path = str(tmpdir.join('manifest.json'))
+    manifest = create_manifest('_plugins_manifest_register.register', manifest_path)
+    assert len(manifest['registrations']) == 3
+
+    pm = PluginManager()
+    pm.load_manifest(manifest_path)
+    assert sorted(f.result().__name__ for f in pm.preload(eps=['EPBar'])) == [
+        'AnotherFooImpl', 'FooImpl']
+
+
+def test_plugins_manifest_threads(tmpdir, register_module):
+    from _pyvmmonitor_core_tests.test_plugins import EPBar, FooImpl
+    manifest_path = str(tmpdir.join('manifest.json'))
+    create_manifest('_plugins_manifest_register.register', manifest_path)
+
+    threads = []
+    found = []
+
+    class SlowRegisterPluginManager(PluginManager):
+
+        def register(self, ep, *args, **kwargs):
+            if ep.__name__ == 'EPFoo':
+                # Another thread requesting the EP must wait for the registrations to be done.
+                t = threading.Thread(target=lambda: found.append(self.get_instance('EPFoo')))
+                t.start()
+                t.join(.2)
+                assert t.is_alive()
+                threads.append(t)
+            PluginManager.register(self, ep, *args, **kwargs)
+
+    pm = SlowRegisterPluginManager()
+    pm.load_manifest(manifest_path)
+    assert len(pm.get_implementations(EPBar)) == 2
+
+    # Only the EPFoo registration is pending now.
+    assert isinstance(pm.get_instance('EPFoo'), FooImpl)
+    for t in threads:
+        t.join()
+    assert found == [pm.get_instance('EPFoo')]
+
+
+def test_plugins_manifest_lock(tmpdir, register_module):
+    from _pyvmmonitor_core_tests.test_plugins import EPBar, FooImpl
+    manifest_path = str(tmpdir.join('manifest.json'))
+    create_manifest('_plugins_manifest_register.register', manifest_path)
+
+    found = []
+
+    class CheckLockPluginManager(PluginManager):
+
+        def register(self, ep, *args, **kwargs):
+            if ep.__name__ == 'EPFoo':
+                # The manifest lock isn't held while registering (another EP may be registered
+                # in the meanwhile).
+                t = threading.Thread(target=lambda: found.extend(self.get_implementations(EPBar)))
+                t.start()
+                t.join(2)
+                assert not t.is_alive()
+            PluginManager.register(self, ep, *args, **kwargs)
+
+    pm = CheckLockPluginManager()
+    pm.load_manifest(manifest_path)
+    assert isinstance(pm.get_instance('EPFoo'), FooImpl)
+    assert len(found) == 2
+    assert not pm._manifest_pending_names
+
+    # EPs which aren't pending don't need the manifest lock.
+    pm = PluginManager()
+    pm.load_manifest(manifest_path)
+    foo = pm.get_instance('EPFoo')
+    with pm._manifest_lock:
+        t = threading.Thread(target=lambda: found.append(pm.get_instance('EPFoo')))
+        t.start()
+        t.join(2)
+        assert not t.is_alive()
+    assert found[-1] is foo
+    assert pm._manifest_pending_names == set(['EPBar'])
@@ -0,0 +1,86 @@
+import multiprocessing
+
+import pytest
+
+from pyvmmonitor_core.callback import Callback
+from pyvmmonitor_core.process_callback import (CallbackReceiver,
+                                               CallbackSender)
+
+
+def _send_samples(connection, count):
+    sender = CallbackSender(connection, max_batch=10, max_pending=5)
+    for i in range(count):
+        sender(i, name='sample', values=(i, [i * 2]))
+    sender.close()
+
+
+def _create_receiver():
+    received = []
+
+    def on_sample(i, name, values):
+        received.append((i, name, values))
+
+    callback = Callback()
+    callback.register(on_sample)
+    receiver_connection, sender_connection = multiprocessing.Pipe(duplex=False)
+    receiver = CallbackReceiver(receiver_connection, callback)
+    return receiver, sender_connection, received, on_sample
+
+
+def test_process_callback():
+    receiver, sender_connection, received, _on_sample = _create_receiver()
+
+    process = multiprocessing.Process(target=_send_samples, args=(sender_connection, 50))
+    process.start()
+    try:
+        while not receiver.closed:
+            receiver.dispatch_pending(timeout=5)
+    finally:
+        process.join()
+
+    assert received == [(i, 'sample', (i, [i * 2])) for i in range(50)]
+    assert receiver.dispatch_pending() == 0
+
+
+def test_process_callback_max_batches():
+    receiver, sender_connection, received, _on_sample = _create_receiver()
+    sender = CallbackSender(sender_connection, max_batch=2)
+    sender(1, 'a', ())
+    sender(2, 'b', ())
+    sender(3, 'c', ())
+    sender.close()
+
+    assert receiver.dispatch_pending(timeout=5, max_batches=1) in (1, 2)
+    while not receiver.closed:
+        receiver.dispatch_pending(timeout=5)
+    assert [r[0] for r in received] == [1, 2, 3]
+
+
+def test_process_callback_simple_types():
+    _receiver, sender_connection, _received, _on_sample = _create_receiver()
+    sender = CallbackSender(sender_connection)
+    try:
+        with pytest.raises(TypeError):
+            sender(object())
+        with pytest.raises(TypeError):
+            sender(1, name=[object()])
+    finally:
+        sender.close()
+
+    with pytest.raises(RuntimeError):
+        sender(1)
+
+
+def test_process_callback_receiver_closed():
+    receiver_connection, sender_connection = multiprocessing.Pipe(duplex=False)
+    receiver_connection.close()
+    sender = CallbackSender(sender_connection, max_batch=2, max_pending=2)
+
+    # Sending fails in the sender thread: emitting must raise instead of blocking forever when
+    # the queue is full.
+    with pytest.raises(RuntimeError):
+        for i in range(100):
+            sender(i)
+
+    with pytest.raises(RuntimeError):
+        sender.close()
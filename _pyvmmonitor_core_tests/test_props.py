@@ -88,3 +88,445 @@ def test_props_single_notification():
         props.c = 30
 
     assert notifications == [(props, {'a': (22, 10), 'b': (55, 20)})]
+
+
+def test_props_lazy_callback():
+    from pyvmmonitor_core.props import delayed_notifications
+
+    class MyProps(PropsObject):
+        PropsObject.declare_props(a=10, b=20)
+
+    props = MyProps(a=1)
+    assert props._on_modified_callback is None
+    props.a = 2
+    assert props.create_memento() == {'a': 2}
+
+    notifications = []
+
+    def on_modified(obj, attrs):
+        notifications.append((obj, attrs))
+
+    props.unregister_modified(on_modified)  # No-op
+
+    with delayed_notifications(props):
+        props.a = 3
+        props.register_modified(on_modified)
+        props.b = 4
+
+    assert notifications == [(props, {'a': (3, 2), 'b': (4, 20)})]
+    props.a = 5
+    assert notifications[-1] == (props, {'a': (5, 3)})
+
+
+def test_props_modified_for_props():
+    import pytest
+    from pyvmmonitor_core.props import delayed_notifications
+
+    class MyProps(PropsObject):
+        PropsObject.declare_props(a=10, b=20, c=30)
+
+    props = MyProps()
+    notifications = []
+
+    def on_a_or_b(obj, attrs):
+        notifications.append(('a_or_b', attrs))
+
+    def on_c(obj, attrs):
+        notifications.append(('c', attrs))
+
+    def on_any(obj, attrs):
+        notifications.append(('any', attrs))
+
+    props.register_modified(on_a_or_b, props=('a', 'b'))
+    props.register_modified(on_c, props=['c'])
+    props.register_modified(on_any)
+
+    props.a = 1
+    assert notifications == [('any', {'a': (1, 10)}), ('a_or_b', {'a': (1, 10)})]
+    del notifications[:]
+
+    props.c = 1
+    assert notifications == [('any', {'c': (1, 30)}), ('c', {'c': (1, 30)})]
+    del notifications[:]
+
+    with delayed_notifications(props):
+        props.a = 2
+        props.b = 2
+    # Called only once even if both keys it's interested in changed.
+    assert notifications == [
+        ('any', {'a': (2, 1), 'b': (2, 20)}), ('a_or_b', {'a': (2, 1), 'b': (2, 20)})]
+    del notifications[:]
+
+    props.unregister_modified(on_a_or_b)
+    props.unregister_modified(on_any)
+    props.a = 3
+    props.c = 3
+    assert notifications == [('c', {'c': (3, 1)})]
+
+    with pytest.raises(ValueError):
+        props.register_modified(on_c, props=['d'])
+
+    with pytest.raises(TypeError):
+        props.register_modified(on_c, props='c')
+
+
+def test_props_computed():
+    import pytest
+    from pyvmmonitor_core.props import PropsComputedProperty, delayed_notifications
+
+    computed = []
+
+    def compute_area(rect):
+        computed.append(rect)
+        return rect.w * rect.h
+
+    class Rect(PropsObject):
+        PropsObject.declare_props(
+            w=1,
+            h=2,
+            area=PropsComputedProperty(compute_area, depends=('w', 'h')),
+        )
+
+    class NamedRect(Rect):
+        PropsObject.declare_props(
+            name='',
+            label=PropsComputedProperty(lambda r: '%s: %s' % (r.name, r.w), depends=('name', 'w')),
+        )
+
+    rect = Rect()
+    assert rect.area == 2
+    assert rect.area == 2
+    assert len(computed) == 1
+
+    # Not observed: just invalidated (if it changed).
+    rect.w = 1
+    assert rect.area == 2
+    assert len(computed) == 1
+    rect.w = 2
+    assert len(computed) == 1
+    assert rect.area == 4
+    assert len(computed) == 2
+    assert rect.get_props_as_dict() == {'w': 2, 'h': 2}
+
+    notifications = []
+
+    def on_modified(obj, attrs):
+        notifications.append(attrs)
+
+    rect.register_modified(on_modified)
+    rect.w = 2
+    assert notifications == []
+    assert len(computed) == 2
+
+    rect.w = 3
+    assert notifications == [{'w': (3, 2)}, {'area': (6, 4)}]
+    del notifications[:]
+
+    rect.register_modified(on_modified)
+    with delayed_notifications(rect):
+        rect.w = 1
+        rect.h = 6
+    # Area didn't really change in the end.
+    assert notifications == [{'w': (1, 3), 'h': (6, 2)}]
+
+    named = NamedRect(name='a')
+    assert named.label == 'a: 1'
+    named.name = 'b'
+    named.w = 3
+    assert named.label == 'b: 3'
+    assert named.area == 6
+    assert NamedRect.__props_dependents__ == {
+        'w': ('area', 'label'), 'h': ('area',), 'name': ('label',)}
+    assert Rect.__props_dependents__ == {'w': ('area',), 'h': ('area',)}
+    assert PropsObject.__props_dependents__ is None
+
+    # Computed props may be observed (including the ones from base classes).
+    area_notifications = []
+    named.register_modified(
+        lambda obj, attrs: area_notifications.append(attrs), props=('area', 'label'))
+    named.h = 1
+    assert area_notifications == [{'area': (3, 6)}]
+    with pytest.raises(ValueError):
+        named.register_modified(on_modified, props=('perimeter',))
+
+
+def test_props_transaction():
+    from pyvmmonitor_core.props import delayed_notifications, transaction
+
+    class MyProps(PropsObject):
+        PropsObject.declare_props(a=10, b=20)
+
+    objects = [MyProps() for _i in range(3)]
+    unobserved = MyProps()
+    notifications = []
+
+    def on_modified(obj, attrs):
+        notifications.append((obj, attrs))
+
+    for obj in objects:
+        obj.register_modified(on_modified)
+
+    aggregated = []
+    with transaction(on_aggregated=aggregated.append):
+        with transaction():  # Nested: flushed in the outer one.
+            for obj in objects:
+                obj.a = 1
+                obj.b = 2
+                assert notifications == []
+        objects[0].a = 2
+        objects[1].b = 20
+        objects[2].a = 10
+        objects[2].b = 20
+        with delayed_notifications(objects[0]):
+            objects[0].a = 3
+        unobserved.a = 1
+        assert notifications == []
+
+    assert notifications == [
+        (objects[0], {'a': (3, 10), 'b': (2, 20)}),
+        (objects[1], {'a': (1, 10)}),
+    ]
+    # The changes of objects without listeners are also aggregated.
+    assert aggregated == [notifications + [(unobserved, {'a': (1, 10)})]]
+    assert unobserved.a == 1
+    assert unobserved._on_modified_callback is None
+
+    # Without on_aggregated, objects without listeners aren't tracked.
+    with transaction():
+        unobserved.a = 2
+        assert unobserved._on_modified_callback is None
+
+    del aggregated[:]
+    with transaction(on_aggregated=aggregated.append):
+        for obj in (MyProps(), MyProps(), MyProps()):
+            obj.a = 1
+    assert [attrs for (_obj, attrs) in aggregated[0]] == [{'a': (1, 10)}] * 3
+
+    # Back to notifying right away.
+    objects[2].a = 5
+    assert notifications[-1] == (objects[2], {'a': (5, 10)})
+
+
+def test_props_transaction_computed():
+    from pyvmmonitor_core.props import PropsComputedProperty, transaction
+
+    class Rect(PropsObject):
+        PropsObject.declare_props(
+            w=0,
+            h=0,
+            area=PropsComputedProperty(lambda r: r.w * r.h, depends=('w', 'h')),
+        )
+
+    rect = Rect(h=2)
+    notifications = []
+
+    def on_modified(obj, attrs):
+        notifications.append(attrs)
+
+    rect.register_modified(on_modified)
+    with transaction():
+        rect.w = 3
+    assert notifications == [{'w': (3, 0), 'area': (6, 0)}]
+
+
+def test_props_compare():
+    import pytest
+    from pyvmmonitor_core.props import delayed_notifications
+
+    class Buffer(object):
+
+        def __init__(self):
+            self.version = 0
+
+        def __eq__(self, o):
+            raise AssertionError('Should not be compared by equality.')
+
+        def __ne__(self, o):
+            raise AssertionError('Should not be compared by equality.')
+
+        __hash__ = object.__hash__
+
+    class Data(PropsObject):
+        PropsObject.declare_props(
+            by_identity=PropsCustomProperty(None, compare='identity'),
+            by_hash=PropsCustomProperty('', compare='hash'),
+            by_version=PropsCustomProperty(None, compare='version'),
+            by_custom=PropsCustomProperty(0, compare=lambda prev, val: abs(prev - val) > 1),
+        )
+
+    data = Data()
+    notifications = []
+
+    def on_modified(obj, attrs):
+        notifications.append(attrs)
+
+    data.register_modified(on_modified)
+
+    buf = Buffer()
+    data.by_identity = buf
+    data.by_identity = buf
+    assert notifications == [{'by_identity': (buf, None)}]
+
+    del notifications[:]
+    data.by_hash = 'a' * 10
+    data.by_hash = 'a' * 10
+    assert notifications == [{'by_hash': ('a' * 10, '')}]
+    del notifications[:]
+    data.by_hash = -1
+    data.by_hash = -2  # Same hash.
+    assert notifications == [{'by_hash': (-1, 'a' * 10)}, {'by_hash': (-2, -1)}]
+
+    del notifications[:]
+    data.by_version = buf
+    data.by_version = buf
+    assert notifications == [{'by_version': (buf, None)}]
+    buf.version += 1
+    data.by_version = buf  # Changed in-place.
+    assert notifications == [{'by_version': (buf, None)}, {'by_version': (buf, buf)}]
+
+    del notifications[:]
+    data.by_custom = 1
+    data.by_custom = 3
+    assert notifications == [{'by_custom': (3, 1)}]
+
+    # Merging notifications must also use the compare.
+    del notifications[:]
+    with delayed_notifications(data):
+        data.by_identity = Buffer()
+        data.by_identity = buf
+    assert notifications == [{}]
+
+    with pytest.raises(ValueError):
+        PropsCustomProperty(None, compare='unknown')
+
+
+def test_props_class_layouts():
+
+    class A(PropsObject):
+        PropsObject.declare_props(a=1)
+
+    class B(PropsObject):
+        PropsObject.declare_props(b=2)
+
+    class C(A, B):
+        pass
+
+    c = C(a=10)
+    assert (c.a, c.b) == (10, 2)
+    c.b = 20
+    assert c.get_props_as_dict() == {'a': 10, 'b': 20}
+    assert c.create_memento() == {'a': 10, 'b': 20}
+
+    class WithTupleSlots(PropsObject):
+        __slots__ = ('foo',)
+        PropsObject.declare_props(x=0)
+        PropsObject.add_slot('bar')
+
+    obj = WithTupleSlots(x=3)
+    obj.foo = obj.bar = 1
+    assert obj.x == 3
+
+    class WithLateSlots(PropsObject):
+        PropsObject.declare_props(x=0)
+        __slots__ = ['foo']
+
+    obj = WithLateSlots()
+    obj.x = 3
+    obj.foo = 1
+    assert obj.x == 3
+
+
+def test_props_generated_accessors():
+    from pyvmmonitor_core import props
+
+    class Point(PropsObject):
+        PropsObject.declare_props(x=0)
+
+    setter_names = Point.x.fset.__code__.co_names
+    assert '_p_x' in setter_names  # The slot is accessed directly.
+    assert ('_assert_not_in_coroutine' in setter_names) == props._check_not_in_coroutine()
+
+
+class _Versioned(object):
+
+    def __init__(self):
+        self.version = 0
+
+
+class _Pickled(PropsObject):
+    PropsObject.declare_props(a=10, b=None, buf=PropsCustomProperty(None, compare='version'))
+    PropsObject.add_slot('_internal')
+
+
+class _PickledPoint(PropsObject):
+    PropsObject.declare_props(x=0, y=0)
+
+
+def test_props_clone_and_pickle():
+    import pickle
+    from pyvmmonitor_core.props import clone_many
+
+    obj = _Pickled(a=20)
+    obj._internal = 'internal'
+    notifications = []
+
+    def on_modified(obj, attrs):
+        notifications.append(attrs)
+
+    obj.register_modified(on_modified)
+
+    cloned = obj.clone()
+    assert cloned.__class__ is _Pickled
+    assert cloned.create_memento() == {'a': 20}
+    assert cloned._internal == 'internal'
+
+    unpickled = pickle.loads(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+    assert unpickled.create_memento() == {'a': 20}
+    assert unpickled.b is None
+    assert unpickled._internal == 'internal'
+
+    objects = [_Pickled(a=i) for i in range(3)]
+    assert [o.a for o in clone_many(objects)] == [0, 1, 2]
+
+    # Listeners aren't carried over.
+    for o in (cloned, unpickled):
+        o.b = 1
+        assert o._on_modified_callback is None
+    assert notifications == []
+
+    cloned.register_modified(on_modified)
+    cloned.a = 30
+    assert notifications == [{'a': (30, 20)}]
+    assert obj.a == 20
+
+    # A memento may still be used as the state (i.e.: pickled by a previous version).
+    restored = _Pickled.__new__(_Pickled)
+    restored.__setstate__({'a': 1})
+    assert (restored.a, restored.b) == (1, None)
+
+
+def test_props_clone_version():
+    buf = _Versioned()
+    obj = _Pickled(buf=buf)
+    cloned = obj.clone()
+
+    notifications = []
+    cloned.register_modified(lambda obj, attrs: notifications.append(attrs))
+    cloned.buf = buf  # The version is also copied: not changed.
+    assert notifications == []
+    buf.version += 1
+    cloned.buf = buf
+    assert notifications == [{'buf': (buf, buf)}]
+
+
+def test_props_dumps_many():
+    from pyvmmonitor_core.props import dumps_many, loads_many
+
+    objects = [_Pickled(a=1), _PickledPoint(x=2), _Pickled(a=3)]
+    objects[2]._internal = 'internal'
+    loaded = loads_many(dumps_many(objects))
+    assert [o.__class__ for o in loaded] == [_Pickled, _PickledPoint, _Pickled]
+    assert [o.get_props_as_dict() for o in loaded] == [o.get_props_as_dict() for o in objects]
+    assert loaded[2]._internal == 'internal'
+    assert not hasattr(loaded[0], '_internal')
+    assert loads_many(dumps_many([])) == []
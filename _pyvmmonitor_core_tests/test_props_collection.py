@@ -0,0 +1,108 @@
+import pytest
+
+from pyvmmonitor_core.props import PropsObject
+
+numpy = pytest.importorskip('numpy')
+
+
+class _Point(PropsObject):
+    PropsObject.declare_props(x=0., y=0., name='')
+
+
+def test_props_collection():
+    from pyvmmonitor_core.props_collection import PropsCollection
+
+    points = PropsCollection(_Point, 5)
+    assert len(points) == 5
+    assert points.get_props_names() == frozenset(['x', 'y', 'name'])
+    assert points.get_values('x').tolist() == [0.] * 5
+    assert points.get_values('name').tolist() == [''] * 5
+
+    notifications = []
+
+    def on_modified(collection, key_to_indices):
+        notifications.append(
+            (collection, dict((key, indices.tolist()) for key, indices in key_to_indices.items())))
+
+    points.register_modified(on_modified)
+
+    points.set_values('x', numpy.array([0., 1., 2., 0., 4.]))
+    assert notifications == [(points, {'x': [1, 2, 4]})]
+    del notifications[:]
+
+    points.update({'x': [1., 5.], 'y': 3.}, indices=[1, 3])
+    assert notifications == [(points, {'x': [3], 'y': [1, 3]})]
+    assert points.get_values('x').tolist() == [0., 1., 2., 5., 4.]
+    assert points.get_values('y', [0, 1]).tolist() == [0., 3.]
+    del notifications[:]
+
+    # Nothing changed: no notification.
+    points.set_values('y', 3., indices=numpy.array([False, True, False, True, False]))
+    assert notifications == []
+
+    with points.delayed_notifications():
+        points.set_values('x', 10., indices=[0])
+        points.set_values('x', 11., indices=[2])
+        points.set_values('name', 'a', indices=[2])
+    assert notifications == [(points, {'x': [0, 2], 'name': [2]})]
+    del notifications[:]
+
+    point = points[2]
+    assert point.index == 2
+    assert point.x == 11.
+    assert point.x.__class__ == float
+    assert point.get_props_as_dict() == {'x': 11., 'y': 0., 'name': 'a'}
+    point.y = 7
+    point.y = 7
+    assert notifications == [(points, {'y': [2]})]
+    assert points[-3].y == 7.
+
+    with pytest.raises(IndexError):
+        points[5]
+
+    assert [p.x for p in points] == [10., 1., 11., 5., 4.]
+
+
+def test_props_collection_from_objects():
+    from pyvmmonitor_core.props_collection import PropsCollection
+
+    objects = [_Point(x=i, name=str(i)) for i in range(3)]
+    points = PropsCollection.from_objects(_Point, objects, dtypes={'x': numpy.int32})
+    assert points.get_values('x').dtype == numpy.int32
+    assert points.get_values('x').tolist() == [0, 1, 2]
+    assert points.get_values('name').tolist() == ['0', '1', '2']
+
+
+def test_props_collection_dtypes():
+    from pyvmmonitor_core.props_collection import PropsCollection
+
+    class Item(PropsObject):
+        PropsObject.declare_props(x=0, visible=True)
+
+    items = PropsCollection(Item, 3, dtypes={'visible': bool})
+    assert items.get_values('x').dtype == numpy.float64
+
+    notifications = []
+
+    def on_modified(collection, key_to_indices):
+        notifications.append(sorted(key_to_indices))
+
+    items.register_modified(on_modified)
+    items.set_values('x', [0.5, 1.7, 2.2])
+    assert items.get_values('x').tolist() == [0.5, 1.7, 2.2]
+    items[0].x = 0.5
+    assert notifications == [['x']]
+
+    # Lossy conversions aren't accepted.
+    with pytest.raises(TypeError):
+        items[0].visible = 0.9
+    with pytest.raises(TypeError):
+        items.set_values('visible', [1, 0, 1])
+    assert items.get_values('visible').tolist() == [True, True, True]
+    assert notifications == [['x']]
+
+    # Nothing is set if some of the values can't be set.
+    with pytest.raises(TypeError):
+        items.update({'x': [1., 2., 3.], 'visible': [.5] * 3})
+    assert items.get_values('x').tolist() == [0.5, 1.7, 2.2]
+    assert notifications == [['x']]
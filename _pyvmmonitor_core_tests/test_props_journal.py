@@ -0,0 +1,76 @@
+import os
+from time import time
+
+from pyvmmonitor_core.props import PropsObject
+from pyvmmonitor_core.props_journal import (PropsJournalRecorder,
+                                            PropsJournalReplayer,
+                                            get_index_path)
+
+
+class _Point(PropsObject):
+    PropsObject.declare_props(x=0, y=0, name='')
+
+
+def test_props_journal(tmpdir):
+    path = str(tmpdir.join('session.journal'))
+
+    p1 = _Point(name='p1')
+    p2 = _Point()
+    recorder = PropsJournalRecorder(path, checkpoint_interval=5, max_batch=3)
+    p1_id = recorder.track(p1)
+    p2_id = recorder.track(p2)
+    assert recorder.track(p1) == p1_id
+    tracked_time = time()
+
+    times = []
+    for i in range(20):
+        p1.x = i + 1
+        if i % 3 == 0:
+            p2.y = i * 10 + 1
+        times.append(time())
+
+    recorder.untrack(p2)
+    p2.y = -1  # Not recorded.
+    p1.name = 'changed'
+    recorder.flush()
+    p1.y = [1, (2, 3)]
+    big_name = 'a' * (2 * 1024 * 1024)  # The file must be grown.
+    p2_tracked_again = _Point(name=big_name)
+    recorder.track(p2_tracked_again)
+    recorder.close()
+
+    assert os.path.getsize(get_index_path(path)) > 0
+
+    replayer = PropsJournalReplayer(path)
+    try:
+        assert replayer.get_states(tracked_time - 10) == {}
+        assert replayer.get_states(tracked_time) == {
+            p1_id: ('_pyvmmonitor_core_tests.test_props_journal._Point', {'name': 'p1'}),
+            p2_id: ('_pyvmmonitor_core_tests.test_props_journal._Point', {}),
+        }
+
+        for i, at_time in enumerate(times):
+            states = replayer.get_states(at_time)
+            assert states[p1_id][1] == {'name': 'p1', 'x': i + 1}
+            assert states[p2_id][1] == {'y': (i // 3) * 30 + 1}
+
+        assert replayer.get_states() == {
+            p1_id: ('_pyvmmonitor_core_tests.test_props_journal._Point', {
+                'name': 'changed', 'x': 20, 'y': [1, (2, 3)]}),
+            2: ('_pyvmmonitor_core_tests.test_props_journal._Point', {'name': big_name}),
+        }
+
+        # The states rebuilt from the checkpoints match the ones rebuilt from the start.
+        from_checkpoints = [replayer.get_states(at_time) for at_time in times]
+        del replayer._checkpoint_times[:]
+        del replayer._checkpoint_offsets[:]
+        assert [replayer.get_states(at_time) for at_time in times] == from_checkpoints
+
+        objects = replayer.create_objects(times[10])
+        assert sorted(objects) == [p1_id, p2_id]
+        p1_replayed = objects[p1_id]
+        assert p1_replayed.__class__ is _Point
+        assert (p1_replayed.name, p1_replayed.x, p1_replayed.y) == ('p1', 11, 0)
+        assert objects[p2_id].y == 91
+    finally:
+        replayer.close()
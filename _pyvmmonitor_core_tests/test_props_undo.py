@@ -0,0 +1,136 @@
+from pyvmmonitor_core.props import (PropsComputedProperty, PropsCustomProperty,
+                                    PropsObject)
+from pyvmmonitor_core.props_undo import PropsUndoJournal
+
+
+class _Point(PropsObject):
+    PropsObject.declare_props(
+        x=0,
+        y=0,
+        sum=PropsComputedProperty(lambda p: p.x + p.y, depends=('x', 'y')),
+    )
+
+
+class _ListProp(PropsCustomProperty):
+
+    def convert(self, obj, val):
+        return list(val)
+
+
+class _WithList(PropsObject):
+    PropsObject.declare_props(
+        a=_ListProp([]),
+    )
+
+
+def test_props_undo():
+    p1 = _Point()
+    p2 = _Point()
+    journal = PropsUndoJournal()
+    journal.track(p1)
+    journal.track(p2)
+    assert not journal.can_undo()
+    assert not journal.undo()
+
+    notifications = []
+
+    def on_modified(obj, attrs):
+        notifications.append((obj, attrs))
+
+    p1.register_modified(on_modified)
+
+    with journal.step():
+        p1.x = 1
+        p1.x = 2
+        p1.y = 3
+        p2.x = 4
+    p1.y = 5
+    assert p1.sum == 7
+    assert len(journal) == 2
+
+    del notifications[:]
+    assert journal.undo()
+    assert (p1.x, p1.y, p2.x) == (2, 3, 4)
+    assert journal.undo()
+    assert (p1.x, p1.y, p2.x) == (0, 0, 0)
+    assert p1.sum == 0
+    assert not journal.undo()
+    # A single notification for p1 in each undo.
+    assert notifications == [
+        (p1, {'y': (3, 5), 'sum': (5, 7)}),
+        (p1, {'x': (0, 2), 'y': (0, 3), 'sum': (0, 5)}),
+    ]
+
+    assert journal.redo()
+    assert (p1.x, p1.y, p2.x) == (2, 3, 4)
+    assert journal.can_redo()
+
+    # A new change discards what could be redone.
+    p2.y = 10
+    assert not journal.can_redo()
+    assert len(journal) == 2
+    assert journal.undo()
+    assert p2.y == 0
+    assert journal.undo()
+    assert (p1.x, p1.y, p2.x) == (0, 0, 0)
+
+    journal.clear()
+    assert len(journal) == 0
+    assert not journal.can_redo()
+
+    journal.untrack(p1)
+    p1.x = 1
+    assert len(journal) == 0
+
+
+def test_props_undo_in_transaction():
+    from pyvmmonitor_core.props import transaction
+
+    p = _Point()
+    journal = PropsUndoJournal()
+    journal.track(p)
+    p.x = 1
+    p.y = 2
+
+    with transaction():
+        assert journal.undo()
+        assert journal.undo()
+    assert (p.x, p.y) == (0, 0)
+    # The undo isn't recorded as a new change.
+    assert journal.can_redo()
+    assert len(journal) == 2
+
+    with transaction():
+        assert journal.redo()
+        p.x = 5  # A new change discards what could be redone.
+    assert not journal.can_redo()
+    assert len(journal) == 2
+    assert journal.undo()
+    assert p.x == 1
+
+    journal.clear()
+    assert journal._objects == []
+    assert journal._keys == []
+    p.x = 3
+    assert journal.undo()
+    assert p.x == 1
+
+
+def test_props_undo_converted():
+    obj = _WithList()
+    journal = PropsUndoJournal()
+    journal.track(obj)
+    obj.a = [1]
+    obj.a = [2]
+
+    # The values set are converted (so, what's notified isn't the value replayed).
+    assert journal.undo()
+    assert journal.undo()
+    assert obj.a == []
+    assert journal.redo()
+    assert journal.redo()
+    assert obj.a == [2]
+    assert not journal.can_redo()
+    assert len(journal) == 2
+    assert journal.undo()
+    assert obj.a == [1]
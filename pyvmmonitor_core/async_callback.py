@@ -0,0 +1,102 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+A Callback to be used with asyncio: plain functions registered are called inline when the
+callback is emitted and the coroutines returned by coroutine functions are scheduled to run
+concurrently (with asyncio.gather), optionally limiting how many may run at the same time.
+
+To use:
+
+callback = AsyncCallback(max_concurrency=10)
+
+class MyObject(object):
+    async def receive_notification(self, arg):
+        await ...
+
+my_object = MyObject()
+callback.register(my_object.receive_notification)
+
+# Emitting returns an awaitable which can be awaited to wait for the coroutine listeners
+# (it's not required to await it: the coroutines are already scheduled in the running loop).
+await callback(arg=10)
+
+Note: as with the Callback, only weak-references are kept (unless it's a function) and exceptions
+in listeners are shown with sys.excepthook and not propagated.
+'''
+import asyncio
+import sys
+
+from pyvmmonitor_core.callback import Callback
+
+
+class _DoneAwaitable(object):
+
+    __slots__ = []
+
+    def __await__(self):
+        return iter(())
+
+
+_done_awaitable = _DoneAwaitable()
+
+
+async def _run_limited(semaphore, coroutine):
+    async with semaphore:
+        return await coroutine
+
+
+async def _gather(coroutines, max_concurrency):
+    if max_concurrency is not None and len(coroutines) > max_concurrency:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        coroutines = [_run_limited(semaphore, coroutine) for coroutine in coroutines]
+
+    results = await asyncio.gather(*coroutines, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            # Show it but don't propagate.
+            sys.excepthook(result.__class__, result, result.__traceback__)
+
+
+class AsyncCallback(Callback):
+    '''
+    A Callback which dispatches coroutine listeners concurrently.
+
+    .. note:: must be called with an asyncio loop running if coroutine listeners are
+        registered.
+    '''
+
+    __slots__ = ['_max_concurrency']
+
+    def __init__(self, max_concurrency=None):
+        '''
+        :param int max_concurrency:
+            The maximum number of coroutine listeners running at the same time for one emit
+            (None means no limit).
+        '''
+        Callback.__init__(self)
+        self._max_concurrency = max_concurrency
+
+    def __call__(self, *args, **kwargs):  # @DontTrace
+        '''
+        Calls every registered function with the given args and kwargs (coroutines are scheduled
+        in the running loop).
+
+        :return:
+            An awaitable which is done when all the coroutines scheduled finish.
+        '''
+        coroutines = []
+        for func in self._calculate_to_call():
+            try:
+                ret = func(*args, **kwargs)
+            except Exception:  # Show it but don't propagate.
+                sys.excepthook(*sys.exc_info())
+            else:
+                if asyncio.iscoroutine(ret):
+                    coroutines.append(ret)
+
+        if not coroutines:
+            return _done_awaitable
+
+        return asyncio.ensure_future(_gather(coroutines, self._max_concurrency))
@@ -23,6 +23,10 @@ callback(arg=10)
 
 callback.unregister(my_object.receive_notification)
 
+# Note: functions (i.e.: closures) are kept alive until unregistered, unless an owner is passed
+# (in which case it's unregistered when the owner is garbage-collected).
+callback.register(lambda arg: print(arg), owner=my_object)
+
 '''
 import sys
 import types
@@ -57,11 +61,17 @@ class Callback(object):
 
     __slots__ = [
         '_callbacks',
+        '_priorities',  # Only created when some function is registered with a priority.
+        '_once',  # Only created when some function is registered to be called only once.
+        '_owner_refs',  # Only created when some function is registered with an owner.
         '__weakref__'  # We need this to be able to add weak references to callback objects.
     ]
 
     def __init__(self):
         self._callbacks = odict()
+        self._priorities = None
+        self._once = None
+        self._owner_refs = None
 
     if compat.PY2:
         def _get_key(self, func):
@@ -210,8 +220,11 @@ class Callback(object):
             for func in to_call:
                 if not getattr(func, '__call_out_of_main_thread__', False):
                     raise AssertionError(
-                        'Call: %s out of the main thread (and it is not marked as @not_main_thread_callback)!' %
-                        (func,))
+                        'Call: %s out of the main thread (and it is not marked as '
+                        '@not_main_thread_callback)!' % (func,))
+
+        if self._once:
+            self._remove_once()
 
         for func in to_call:
             try:
@@ -219,18 +232,138 @@ class Callback(object):
             except Exception:                # Show it but don't propagate.
                 sys.excepthook(*sys.exc_info())
 
-    def register(self, func):
+    # Used by subclasses which override __call__ to call the listeners (may be overridden to
+    # change how the listeners are called -- i.e.: to profile them).
+    _call_listeners = __call__
+
+    def _calculate_to_call(self):
+        '''
+        :rtype: list(callable)
+        :returns:
+            The functions which should be called (removing the ones which are already dead).
+        '''
+        callbacks = self._callbacks
+        to_call = []
+        if not callbacks:
+            return to_call
+
+        for key, info in compat.items(callbacks):  # iterate in a copy
+
+            func_obj = info[0]
+            if func_obj is not None:
+                # Ok, we have a self.
+                func_obj = func_obj()
+                if func_obj is None:
+                    # self is dead
+                    del callbacks[key]
+                else:
+                    func_func = info[1]
+                    if func_func is None:
+                        to_call.append(func_obj)
+                    else:
+                        if compat.PY2:
+                            to_call.append(new.instancemethod(func_func, func_obj, info[2]))
+                        else:
+                            to_call.append(new.MethodType(func_func, func_obj))
+
+            else:
+                func_func = info[1]
+
+                # No self: either classmethod or just callable
+                to_call.append(func_func)
+
+        if not is_in_main_thread():
+            for func in to_call:
+                if not getattr(func, '__call_out_of_main_thread__', False):
+                    raise AssertionError(
+                        'Call: %s out of the main thread (and it is not marked as '
+                        '@not_main_thread_callback)!' % (func,))
+
+        if self._once:
+            self._remove_once()
+
+        return to_call
+
+    def _remove_once(self):
+        callbacks = self._callbacks
+        priorities = self._priorities
+        owner_refs = self._owner_refs
+        for key in self._once:
+            callbacks.pop(key, None)
+            if priorities is not None:
+                priorities.pop(key, None)
+            if owner_refs is not None:
+                owner_refs.pop(key, None)
+        self._once.clear()
+
+    def register(self, func, priority=0, once=False, owner=None):
         '''
         Registers a function in the callback.
 
         :param object func:
             Method or function that will be called later.
+
+        :param int priority:
+            Functions with a higher priority are called first (functions with the same priority
+            are called in the order they were registered).
+
+        :param bool once:
+            If True, the function is automatically unregistered when the callback is called.
+
+        :param object owner:
+            If given, the function is automatically unregistered when the owner is garbage
+            collected (useful for closures, which are otherwise kept alive until explicitly
+            unregistered).
+
+            Note that the function must not have a strong reference to the owner (otherwise
+            the owner will be kept alive by the callback).
         '''
         key = self._get_key(func)
         callbacks = self._callbacks
 
         callbacks.pop(key, None)  # remove if it exists
-        callbacks[key] = self._get_info(func)
+        info = self._get_info(func)
+
+        owner_refs = self._owner_refs
+        if owner is not None:
+            if owner_refs is None:
+                owner_refs = self._owner_refs = {}
+            owner_refs[key] = weakref.ref(owner, _OwnerCollected(weakref.ref(self), key))
+        elif owner_refs:
+            owner_refs.pop(key, None)
+
+        once_keys = self._once
+        if once:
+            if once_keys is None:
+                once_keys = self._once = set()
+            once_keys.add(key)
+        elif once_keys:
+            once_keys.discard(key)
+
+        priorities = self._priorities
+        if priority:
+            if priorities is None:
+                priorities = self._priorities = {}
+            priorities[key] = priority
+        elif priorities:
+            priorities.pop(key, None)
+
+        if priorities and callbacks:
+            # The callbacks are kept sorted by priority (so, nothing needs to be sorted when
+            # called): if it can't be added at the end, recreate it inserting in the proper place.
+            last_key = next(reversed(callbacks))
+            if priorities.get(last_key, 0) < priority:
+                items = compat.items(callbacks)
+                callbacks.clear()
+                inserted = False
+                for k, v in items:
+                    if not inserted and priorities.get(k, 0) < priority:
+                        callbacks[key] = info
+                        inserted = True
+                    callbacks[k] = v
+                return
+
+        callbacks[key] = info
 
     def unregister(self, func):
         '''
@@ -239,8 +372,9 @@ class Callback(object):
         :param object func:
             The function to be unregistered.
         '''
-        key = self._get_key(func)
+        self._unregister_key(self._get_key(func))
 
+    def _unregister_key(self, key):
         try:
             # As there can only be 1 instance with the same id alive, it should be OK just
             # deleting it directly (because if there was a dead reference pointing to it it will
@@ -250,17 +384,48 @@ class Callback(object):
             # Even when unregistering some function that isn't registered we shouldn't trigger an
             # exception, just do nothing
             pass
+        else:
+            if self._priorities:
+                self._priorities.pop(key, None)
+            if self._once:
+                self._once.discard(key)
+            if self._owner_refs:
+                self._owner_refs.pop(key, None)
 
     def unregister_all(self):
         '''
         Unregisters all functions
         '''
         self._callbacks.clear()
+        self._priorities = None
+        self._once = None
+        self._owner_refs = None
 
     def __len__(self):
         return len(self._callbacks)
 
 
+class _OwnerCollected(object):
+    '''
+    Unregisters a function from a callback when the owner of the function is garbage collected.
+    '''
+
+    __slots__ = ['_callback_ref', '_key']
+
+    def __init__(self, callback_ref, key):
+        self._callback_ref = callback_ref
+        self._key = key
+
+    def __call__(self, owner_ref):
+        callback = self._callback_ref()
+        if callback is None:
+            return
+
+        owner_refs = callback._owner_refs
+        if owner_refs and owner_refs.get(self._key) is owner_ref:
+            callback._unregister_key(self._key)
+
+
 def not_main_thread_callback(func):
     func.__call_out_of_main_thread__ = True
     return func
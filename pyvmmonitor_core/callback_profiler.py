@@ -0,0 +1,210 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+Helpers to profile the listeners of a Callback (to discover which listener makes an emit slow).
+
+To use:
+
+profiler = CallbackProfiler(slow_threshold=0.05)
+profiler.install(callback)
+
+...
+
+for stats in profiler.get_stats(callback):
+    print(stats.name, stats.count, stats.total_time, stats.max_time)
+
+profiler.uninstall(callback)
+
+Listeners which take more than slow_threshold seconds are logged as a warning (or reported to
+on_slow(callback, func, elapsed) if given).
+
+Note: installing changes the class of the callback to a subclass which does the profiling (so,
+callbacks which don't have the profiler installed don't have any additional overhead). Any
+Callback subclass may be profiled (for coroutine listeners of an AsyncCallback only the time to
+create the coroutine is measured and for a PropsObject modified callback the listeners registered
+only for some keys aren't profiled).
+'''
+import sys
+import time
+import weakref
+
+from pyvmmonitor_core.callback import Callback
+from pyvmmonitor_core.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    perf_counter = time.perf_counter
+except AttributeError:
+    perf_counter = time.time  # Python 2
+
+# Callback -> CallbackProfiler
+_callback_to_profiler = weakref.WeakKeyDictionary()
+
+
+def _get_name(func):
+    func_self = getattr(func, '__self__', None)
+    if func_self is not None:
+        return '%s.%s' % (func_self.__class__.__name__, func.__name__)
+
+    name = getattr(func, '__name__', None)
+    if name is not None:
+        return '%s.%s' % (getattr(func, '__module__', '?'), name)
+
+    return '%s instance' % (func.__class__.__name__,)
+
+
+class ListenerStats(object):
+
+    __slots__ = ['name', 'count', 'total_time', 'max_time']
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_time = 0.
+        self.max_time = 0.
+
+    def __repr__(self):
+        return '<ListenerStats %s: count=%s total_time=%.6f max_time=%.6f>' % (
+            self.name, self.count, self.total_time, self.max_time)
+
+
+class _TimedListener(object):
+
+    __slots__ = ['_profiler', '_callback', '_func']
+
+    def __init__(self, profiler, callback, func):
+        self._profiler = profiler
+        self._callback = callback
+        self._func = func
+
+    def __call__(self, *args, **kwargs):
+        initial_time = perf_counter()
+        try:
+            return self._func(*args, **kwargs)
+        finally:
+            self._profiler._on_called(self._callback, self._func, perf_counter() - initial_time)
+
+
+# Callback subclass -> subclass which does the profiling (and vice-versa).
+_class_to_profiled_class = {}
+_profiled_class_to_class = {}
+
+
+def _get_func(method):
+    return getattr(method, '__func__', method)  # Unbound method in Python 2.
+
+
+def _get_profiled_class(cls):
+    try:
+        return _class_to_profiled_class[cls]
+    except KeyError:
+        pass
+
+    cls_calculate_to_call = cls._calculate_to_call
+
+    def _calculate_to_call(self):
+        to_call = cls_calculate_to_call(self)
+        profiler = _callback_to_profiler.get(self)
+        if profiler is None:
+            return to_call
+        return [_TimedListener(profiler, self, func) for func in to_call]
+
+    def _call_listeners(self, *args, **kwargs):  # @DontTrace
+        for func in self._calculate_to_call():
+            try:
+                func(*args, **kwargs)
+            except Exception:  # Show it but don't propagate.
+                sys.excepthook(*sys.exc_info())
+
+    namespace = {
+        '__slots__': [],
+        '_calculate_to_call': _calculate_to_call,
+        '_call_listeners': _call_listeners,
+    }
+    if _get_func(cls.__call__) is _get_func(Callback.__call__):
+        # Subclasses which override __call__ call the listeners through _call_listeners or
+        # _calculate_to_call.
+        namespace['__call__'] = _call_listeners
+
+    profiled_class = type('_Profiled' + cls.__name__, (cls,), namespace)
+    _class_to_profiled_class[cls] = profiled_class
+    _profiled_class_to_class[profiled_class] = cls
+    return profiled_class
+
+
+class CallbackProfiler(object):
+
+    def __init__(self, slow_threshold=None, on_slow=None):
+        '''
+        :param float slow_threshold:
+            If given, listeners which take more than this time (in seconds) are reported.
+
+        :param callable on_slow:
+            If given, called as on_slow(callback, func, elapsed) to report slow listeners
+            (otherwise a warning is logged).
+        '''
+        self.slow_threshold = slow_threshold
+        self.on_slow = on_slow
+        self._callback_to_stats = weakref.WeakKeyDictionary()
+
+    def install(self, callback):
+        if callback.__class__ in _profiled_class_to_class:
+            profiler = _callback_to_profiler.get(callback)
+            if profiler is not None and profiler is not self:
+                profiler.uninstall(callback)
+
+        elif isinstance(callback, Callback):
+            callback.__class__ = _get_profiled_class(callback.__class__)
+
+        else:
+            raise TypeError('Only instances of Callback can be profiled (found: %s).' % (
+                callback.__class__,))
+
+        _callback_to_profiler[callback] = self
+        self._callback_to_stats.setdefault(callback, {})
+
+    def uninstall(self, callback):
+        if _callback_to_profiler.get(callback) is self:
+            del _callback_to_profiler[callback]
+            callback.__class__ = _profiled_class_to_class[callback.__class__]
+
+    def get_stats(self, callback):
+        '''
+        :return list(ListenerStats):
+            The stats for the listeners of the given callback (sorted by the total time).
+        '''
+        stats = self._callback_to_stats.get(callback, {})
+        return sorted(stats.values(), key=lambda s: s.total_time, reverse=True)
+
+    def clear_stats(self):
+        for stats in self._callback_to_stats.values():
+            stats.clear()
+
+    def _on_called(self, callback, func, elapsed):
+        stats = self._callback_to_stats.get(callback)
+        if stats is None:
+            stats = self._callback_to_stats[callback] = {}
+
+        key = callback._get_key(func)
+        listener_stats = stats.get(key)
+        if listener_stats is None:
+            listener_stats = stats[key] = ListenerStats(_get_name(func))
+        listener_stats.count += 1
+        listener_stats.total_time += elapsed
+        if elapsed > listener_stats.max_time:
+            listener_stats.max_time = elapsed
+
+        slow_threshold = self.slow_threshold
+        if slow_threshold is not None and elapsed > slow_threshold:
+            self._report_slow(callback, func, elapsed)
+
+    def _report_slow(self, callback, func, elapsed):
+        if self.on_slow is not None:
+            self.on_slow(callback, func, elapsed)
+        else:
+            logger.warning(
+                'Slow callback listener: %s took %.3fs (threshold: %.3fs).',
+                _get_name(func), elapsed, self.slow_threshold)
@@ -0,0 +1,155 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+A Callback which merges the emits which arrive in a time window (or until an explicit flush) so
+that the listeners are called only once for a burst of emits.
+
+To use:
+
+# The schedule receives a delay (in seconds) and a function to be called after that delay, i.e.:
+# Qt: schedule = lambda delay, func: QTimer.singleShot(int(delay * 1000), func)
+# asyncio: schedule = loop.call_later
+callback = CoalescingCallback(merge=merge_modified, window=1. / 60, schedule=schedule)
+callback.register(on_modified)
+
+props_obj.register_modified(callback)  # Note: only a weak-reference to callback is kept.
+
+If no schedule is given, the pending emit is delivered on an explicit call to flush() or when a
+new emit arrives after the window elapsed.
+
+Merge strategies receive the pending (args, kwargs) (or None if there's nothing pending) and the
+args and kwargs of the new emit and return the new pending (args, kwargs) -- or None if the
+merged emits cancel each other.
+'''
+import time
+
+from pyvmmonitor_core import compat
+from pyvmmonitor_core.callback import Callback
+
+
+def merge_last(pending, args, kwargs):
+    '''
+    The last emit wins.
+    '''
+    return args, kwargs
+
+
+def merge_accumulate(pending, args, kwargs):
+    '''
+    Listeners are called with a single list with the args (tuple) of each emit.
+    '''
+    if kwargs:
+        raise TypeError('merge_accumulate does not accept keyword arguments.')
+
+    if pending is None:
+        return ([args],), {}
+
+    pending[0][0].append(args)
+    return pending
+
+
+def merge_modified(pending, args, kwargs):
+    '''
+    Merges emits with the same signature of the PropsObject modified callback: (obj, attrs) where
+    attrs is a dict(key->(new_val, old_val)) -- the keys are merged keeping the first old value
+    and the last new value (a key whose value goes back to the original value is removed).
+
+    .. note:: it's meant to be used for emits done always with the same obj.
+    '''
+    obj, attrs = args
+    if pending is None:
+        merged = {}
+        pending = (obj, merged), {}
+    else:
+        merged = pending[0][1]
+
+    for key, (new_val, old_val) in compat.iteritems(attrs):
+        prev_notification = merged.get(key)
+        if prev_notification is not None:
+            old_val = prev_notification[1]
+
+        if new_val == old_val:
+            merged.pop(key, None)
+        else:
+            merged[key] = (new_val, old_val)
+
+    if not merged:
+        return None
+    return pending
+
+
+class CoalescingCallback(Callback):
+
+    __slots__ = ['_merge', '_window', '_schedule', '_pending', '_pending_time', '_schedule_id']
+
+    def __init__(self, merge=merge_last, window=None, schedule=None):
+        '''
+        :param callable merge:
+            The strategy used to merge emits: merge(pending, args, kwargs) -> (args, kwargs)
+
+        :param float window:
+            The time (in seconds) in which emits are merged (if None, emits are only delivered
+            on an explicit flush).
+
+        :param callable schedule:
+            Used as schedule(window, func) when the first emit of a window arrives (func flushes
+            the pending emit).
+        '''
+        Callback.__init__(self)
+        self._merge = merge
+        self._window = window
+        self._schedule = schedule
+        self._pending = None
+        self._pending_time = None
+        self._schedule_id = 0
+
+    def __call__(self, *args, **kwargs):  # @DontTrace
+        pending = self._pending
+        if pending is None:
+            self._pending = self._merge(None, args, kwargs)
+            if self._pending is not None and self._window is not None:
+                if self._schedule is not None:
+                    self._schedule_flush()
+                else:
+                    self._pending_time = time.time()
+        else:
+            self._pending = pending = self._merge(pending, args, kwargs)
+            if pending is None:
+                self._pending_time = None
+
+            elif self._pending_time is not None:
+                if time.time() - self._pending_time >= self._window:
+                    self.flush()
+
+    def _schedule_flush(self):
+        # A flush scheduled for a previous burst (which was cancelled or flushed explicitly)
+        # must not flush the new burst before its window elapses.
+        self._schedule_id += 1
+        schedule_id = self._schedule_id
+
+        def on_window_elapsed():
+            if schedule_id == self._schedule_id:
+                self.flush()
+
+        self._schedule(self._window, on_window_elapsed)
+
+    def has_pending(self):
+        return self._pending is not None
+
+    def discard_pending(self):
+        self._pending = None
+        self._pending_time = None
+
+    def flush(self):
+        '''
+        Calls the listeners with the merged emit (if there's one pending).
+        '''
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        self._pending_time = None
+        args, kwargs = pending
+        self._call_listeners(*args, **kwargs)
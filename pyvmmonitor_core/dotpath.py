@@ -29,3 +29,22 @@ def name(path):
         return path[index + 1:]
     else:
         return path
+
+
+def split(path):
+    '''
+    split('a.b.c.d') => ['a', 'b', 'c', 'd']
+    split('foo') => ['foo']
+    split('') => []
+    '''
+    if not path:
+        return []
+    return path.split('.')
+
+
+def join(*parts):
+    '''
+    join('a', 'b.c', 'd') => 'a.b.c.d'
+    join('', 'foo') => 'foo'
+    '''
+    return '.'.join(part for part in parts if part)
@@ -0,0 +1,139 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+An event bus where listeners subscribe to dotted topics.
+
+To use:
+
+bus = EventBus()
+
+bus.subscribe('process.10.cpu', on_cpu_of_process_10)
+bus.subscribe('process.*.cpu', on_cpu)  # '*' matches exactly one part.
+bus.subscribe('process.**', on_process)  # '**' (only as the last part) matches 1 or more parts.
+
+bus.publish('process.10.cpu', 33.5)  # Calls on_cpu_of_process_10, on_cpu and on_process with
+                                     # ('process.10.cpu', 33.5).
+
+The subscriptions are kept in a trie of the topic parts (where each node has a Callback), so,
+a publish only visits the nodes matching the topic (and not all the subscriptions).
+
+Note: a Callback is used for each subscription, so, only weak-references are kept (unless it's a
+function) and exceptions in listeners are shown with sys.excepthook and not propagated.
+'''
+from pyvmmonitor_core import dotpath
+from pyvmmonitor_core.callback import Callback
+
+ANY_PART = '*'
+ANY_PARTS = '**'
+
+
+class _TopicNode(object):
+
+    __slots__ = ['children', 'callback']
+
+    def __init__(self):
+        self.children = {}
+        self.callback = None
+
+    def is_empty(self):
+        return not self.children and (self.callback is None or not len(self.callback))
+
+
+class EventBus(object):
+
+    def __init__(self):
+        self._root = _TopicNode()
+
+    def subscribe(self, topic, func):
+        '''
+        :param str topic:
+            The topic to subscribe to (may have '*' to match any part and '**' as the last part
+            to match any number of parts).
+
+        :param callable func:
+            The function to be called as func(topic, *args, **kwargs) when something is published
+            in a matching topic.
+        '''
+        parts = dotpath.split(topic)
+        if ANY_PARTS in parts[:-1]:
+            raise ValueError('%s may only be used as the last part of the topic (topic: %s).' % (
+                ANY_PARTS, topic))
+
+        node = self._root
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _TopicNode()
+            node = child
+
+        if node.callback is None:
+            node.callback = Callback()
+        node.callback.register(func)
+
+    def unsubscribe(self, topic, func):
+        path = [self._root]
+        parts = dotpath.split(topic)
+        for part in parts:
+            node = path[-1].children.get(part)
+            if node is None:
+                return
+            path.append(node)
+
+        node = path[-1]
+        if node.callback is not None:
+            node.callback.unregister(func)
+
+        # Remove the nodes which aren't needed anymore.
+        for i in reversed(range(len(parts))):
+            node = path[i + 1]
+            if not node.is_empty():
+                break
+            del path[i].children[parts[i]]
+
+    def publish(self, topic, *args, **kwargs):
+        '''
+        Calls the listeners subscribed to topics matching the given topic with
+        (topic, *args, **kwargs).
+        '''
+        to_call = []
+        nodes = [self._root]
+        for part in dotpath.split(topic):
+            next_nodes = []
+            for node in nodes:
+                children = node.children
+                if not children:
+                    continue
+
+                child = children.get(ANY_PARTS)
+                if child is not None and child.callback is not None:
+                    to_call.append(child.callback)
+
+                child = children.get(part)
+                if child is not None:
+                    next_nodes.append(child)
+
+                child = children.get(ANY_PART)
+                if child is not None:
+                    next_nodes.append(child)
+
+            nodes = next_nodes
+            if not nodes:
+                break
+
+        for node in nodes:
+            if node.callback is not None:
+                to_call.append(node.callback)
+
+        for callback in to_call:
+            callback(topic, *args, **kwargs)
+
+    def has_subscriptions(self):
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            if node.callback is not None and len(node.callback):
+                return True
+            nodes.extend(node.children.values())
+        return False
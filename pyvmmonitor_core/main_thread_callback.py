@@ -0,0 +1,131 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+Helpers to marshal Callback emits done in secondary threads to the main thread.
+
+To use:
+
+# The pump receives a function which must be called later on in the main thread, i.e.:
+# Qt: marshaler = MainThreadMarshaler(lambda func: QTimer.singleShot(0, func))
+# asyncio: marshaler = MainThreadMarshaler(create_asyncio_pump(loop))
+marshaler = MainThreadMarshaler(pump)
+
+callback = MarshaledCallback(marshaler, coalesce=True)
+callback.register(on_sample)
+
+# In a secondary thread:
+callback(sample)  # on_sample(sample) will be called later on in the main thread.
+
+Emits done in the main thread are dispatched directly. Emits done in secondary threads are put
+in a queue (a collections.deque, whose append/popleft are thread-safe without additional
+locking) and are delivered in batches: a burst of emits only asks the pump for a single wakeup.
+'''
+from collections import deque
+
+from pyvmmonitor_core.callback import Callback
+from pyvmmonitor_core.thread_utils import is_in_main_thread
+
+
+def create_asyncio_pump(loop):
+    '''
+    :param asyncio.AbstractEventLoop loop:
+        The loop running in the main thread.
+
+    :return:
+        A pump to be used in the MainThreadMarshaler.
+    '''
+    return loop.call_soon_threadsafe
+
+
+class MainThreadMarshaler(object):
+    '''
+    Keeps the emits done in secondary threads and delivers them in the main thread when the pump
+    calls the function it received.
+    '''
+
+    def __init__(self, pump):
+        '''
+        :param callable pump:
+            A callable which receives a function without arguments that must be called later on
+            in the main thread (it may be called from any thread).
+        '''
+        self._pump = pump
+        self._pending = deque()
+        self._scheduled = False
+
+    def post(self, callback, args, kwargs, coalesce=False):
+        '''
+        Adds an emit to be delivered in the main thread (may be called from any thread).
+
+        :param Callback callback:
+            The callback to be called in the main thread.
+
+        :param bool coalesce:
+            If True, only the last emit posted for the given callback is delivered in a batch.
+        '''
+        self._pending.append((callback, args, kwargs, coalesce))
+        if not self._scheduled:
+            self._scheduled = True
+            self._pump(self.flush)
+
+    def flush(self):
+        '''
+        Delivers all the pending emits (must be called in the main thread).
+        '''
+        # Reset before draining: anything posted from now on will ask for a new wakeup (at worst
+        # we'll have a wakeup without anything to deliver).
+        self._scheduled = False
+
+        pending = self._pending
+        batch = []
+        try:
+            while True:
+                batch.append(pending.popleft())
+        except IndexError:
+            pass
+
+        if not batch:
+            return
+
+        callback_id_to_last_index = {}
+        for i, entry in enumerate(batch):
+            if entry[3]:
+                callback_id_to_last_index[id(entry[0])] = i
+
+        for i, (callback, args, kwargs, coalesce) in enumerate(batch):
+            if coalesce and callback_id_to_last_index[id(callback)] != i:
+                continue
+            callback._call_listeners(*args, **kwargs)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class MarshaledCallback(Callback):
+    '''
+    A Callback which may be emitted from any thread: emits from secondary threads are delivered
+    to the listeners in the main thread through a MainThreadMarshaler.
+    '''
+
+    __slots__ = ['_marshaler', '_coalesce']
+
+    def __init__(self, marshaler, coalesce=False):
+        '''
+        :param MainThreadMarshaler marshaler:
+            The marshaler which will deliver emits from secondary threads.
+
+        :param bool coalesce:
+            If True, when multiple emits are done before the main thread is awaken only the
+            last one is delivered.
+        '''
+        Callback.__init__(self)
+        self._marshaler = marshaler
+        self._coalesce = coalesce
+
+    def __call__(self, *args, **kwargs):  # @DontTrace
+        if is_in_main_thread():
+            self._call_listeners(*args, **kwargs)
+        else:
+            self._marshaler.post(self, args, kwargs, self._coalesce)
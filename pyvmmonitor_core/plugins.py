@@ -35,12 +35,19 @@ def m1(foo_instance, bar_instances, pm):
 
 import functools
 import sys
+import threading
+import time
 
 from pyvmmonitor_core import compat
 from pyvmmonitor_core.callback import Callback
 from pyvmmonitor_core.lazy_loading import load_token
 from pyvmmonitor_core.weak_utils import get_weakref
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # Python 2
+
 if sys.version_info[0] >= 3:
     string_types = (str,)
 else:
@@ -61,12 +68,71 @@ class InstanceAlreadyRegisteredError(RuntimeError):
     pass
 
 
+class AsyncOnlyPluginError(RuntimeError):
+    '''
+    Raised when get_instance is used for an implementation which can only be created
+    asynchronously (with an async plugins_acreate factory -- use aget_instance).
+    '''
+
+
 class IPluginsExit(object):
 
     def plugins_exit(self):
         pass
 
 
+class IPluginsDepends(object):
+
+    # The EPs (classes or names) this implementation depends on: when initializing instances
+    # (PluginManager.init_instances) the instances of those are created first and when exiting
+    # (PluginManager.exit) this one exits first.
+    plugins_depends = ()
+
+
+def _get_topological_levels(nodes, node_to_dependencies):
+    '''
+    :param list nodes:
+        The nodes to be sorted.
+
+    :param dict(node->list(node)) node_to_dependencies:
+        The nodes each node depends on.
+
+    :return tuple(list(list(node)), list(node)):
+        The nodes in levels (the nodes in a level only depend on nodes in previous levels) and
+        the nodes which couldn't be sorted because of a cycle.
+    '''
+    node_to_dependents = dict((node, []) for node in nodes)
+    node_to_pending_count = {}
+    for node in nodes:
+        dependencies = node_to_dependencies.get(node, ())
+        node_to_pending_count[node] = len(dependencies)
+        for dependency in dependencies:
+            node_to_dependents[dependency].append(node)
+
+    levels = []
+    level = [node for node in nodes if node_to_pending_count[node] == 0]
+    while level:
+        levels.append(level)
+        next_level = []
+        for node in level:
+            for dependent in node_to_dependents[node]:
+                node_to_pending_count[dependent] -= 1
+                if node_to_pending_count[dependent] == 0:
+                    next_level.append(dependent)
+        level = next_level
+
+    cycle = [node for node in nodes if node_to_pending_count[node] > 0]
+    return levels, cycle
+
+
+def _call_plugins_exit(instance):
+    try:
+        instance.plugins_exit()
+    except Exception:
+        import traceback
+        traceback.print_exc()
+
+
 class PluginManager(object):
 
     '''
@@ -92,18 +158,187 @@ class PluginManager(object):
         self._ep_to_instance_impls = {}
         self._ep_to_context_to_instance = {}
         self._name_to_ep = {}
+        self._impl_to_class = {}
+        self._construction_locks = {}
+        self._construction_locks_lock = threading.Lock()
+
+        # Registrations from a manifest which weren't done yet (see: load_manifest).
+        self._manifest_ep_path_to_registrations = {}
+        self._manifest_name_to_ep_path = {}
+        self._manifest_ep_path_to_lock = {}
+        self._manifest_lock = threading.Lock()
+
+        # The names of the EPs with registrations pending from a manifest (checked without the
+        # lock, so, an EP is only removed after its registrations are done).
+        self._manifest_pending_names = set()
+
+        # (ep, context) -> asyncio.Future with the instance being created (see: aget_instance).
+        self._async_creating = {}
+
+        # Incremented whenever the registry changes (used to invalidate caches -- i.e.: the one
+        # from @inject(__cache__=True)).
+        self._registry_version = 0
+
+        # cache key -> (registry version, tuple(tuple(key, value))) (see: inject).
+        self._inject_cache = {}
+
         self.exited = False
         self.on_about_to_exit = Callback()
 
+    def _load_class(self, impl):
+        '''
+        Loads the class of an implementation (the result is cached as it's called whenever an
+        implementation is created).
+        '''
+        try:
+            return self._impl_to_class[impl]
+        except KeyError:
+            class_ = self._impl_to_class[impl] = load_class(impl)
+            return class_
+
+    def preload(self, eps=None, executor=None):
+        '''
+        Loads the classes of the registered implementations in a thread pool (i.e.: to import
+        the implementations during some idle time at startup).
+
+        :param list(EP|str) eps:
+            The EPs whose implementations should be loaded (if None, all the registered
+            implementations are loaded).
+
+        :param concurrent.futures.Executor executor:
+            The executor where the classes should be loaded (if None, a ThreadPoolExecutor is
+            created and shut down when all the classes are loaded).
+
+        :return list(concurrent.futures.Future):
+            The futures with the classes loaded (an ImportError is set in the future if some
+            implementation can't be loaded).
+        '''
+        if eps is not None:
+            eps = set(self._name_to_ep.get(ep, ep) if ep.__class__ in string_types else ep
+                      for ep in eps)
+
+        impls = set()
+        for ep, registered in compat.iteritems(self._ep_to_impls):
+            if eps is None or ep in eps:
+                impls.update(impl for impl, _kwargs in registered)
+
+        for (ep, _context), registered in compat.iteritems(self._ep_to_instance_impls):
+            if eps is None or ep in eps:
+                impls.update(impl for impl, _kwargs in registered)
+
+        if self._manifest_ep_path_to_registrations:
+            if eps is not None:
+                ep_paths = set(
+                    self._manifest_name_to_ep_path.get(ep) if ep.__class__ in string_types
+                    else '%s.%s' % (ep.__module__, ep.__name__) for ep in eps)
+            with self._manifest_lock:
+                for ep_path, registrations in compat.iteritems(
+                        self._manifest_ep_path_to_registrations):
+                    if eps is None or ep_path in ep_paths:
+                        impls.update(registration['impl'] for registration in registrations)
+
+        shutdown = False
+        if executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=4)
+            shutdown = True
+
+        try:
+            return [executor.submit(self._load_class, impl) for impl in sorted(impls)]
+        finally:
+            if shutdown:
+                # Note: doesn't wait (the classes are loaded in the background).
+                executor.shutdown(wait=False)
+
+    def load_manifest(self, manifest_path):
+        '''
+        Loads the registrations from a manifest created with
+        pyvmmonitor_core.plugins_manifest.create_manifest.
+
+        Note: the registrations of an EP are only actually done (and the EP loaded) when it's
+        first requested.
+        '''
+        from pyvmmonitor_core.plugins_manifest import read_manifest
+        manifest = read_manifest(manifest_path)
+        with self._manifest_lock:
+            for registration in manifest['registrations']:
+                ep_path = registration['ep']
+                self._manifest_ep_path_to_registrations.setdefault(
+                    ep_path, []).append(registration)
+                name = ep_path.rsplit('.', 1)[-1]
+                self._manifest_name_to_ep_path[name] = ep_path
+                self._manifest_pending_names.add(name)
+            self._registry_version += 1
+
+    def _register_from_manifest(self, ep):
+        '''
+        Does the registrations of the given EP (class or name) which are still pending from a
+        loaded manifest.
+
+        Note: the manifest lock is only held to access the pending registrations (the EP is
+        loaded and registered holding just a lock for the EP).
+        '''
+        if ep.__class__ in string_types:
+            name = ep
+        else:
+            name = ep.__name__
+        if name not in self._manifest_pending_names:
+            return
+
+        with self._manifest_lock:
+            if ep.__class__ in string_types:
+                ep_path = self._manifest_name_to_ep_path.get(ep)
+                ep_class = None
+            else:
+                ep_path = '%s.%s' % (ep.__module__, ep.__name__)
+                ep_class = ep
+
+            registrations = self._manifest_ep_path_to_registrations.get(ep_path)
+            if not registrations:
+                return
+
+            ep_lock = self._manifest_ep_path_to_lock.get(ep_path)
+            if ep_lock is None:
+                ep_lock = self._manifest_ep_path_to_lock[ep_path] = threading.Lock()
+
+        with ep_lock:
+            if ep_path not in self._manifest_ep_path_to_registrations:
+                return  # Registered by another thread while waiting for the lock.
+
+            if ep_class is None:
+                ep_class = load_token(ep_path)
+
+            while registrations:
+                registration = registrations[0]
+                self.register(
+                    ep_class,
+                    registration['impl'],
+                    kwargs=registration['kwargs'],
+                    context=registration['context'],
+                    keep_instance=registration['keep_instance'])
+                with self._manifest_lock:
+                    del registrations[0]
+
+            with self._manifest_lock:
+                del self._manifest_ep_path_to_registrations[ep_path]
+                del self._manifest_ep_path_to_lock[ep_path]
+                name = ep_path.rsplit('.', 1)[-1]
+                if not any(pending_path.rsplit('.', 1)[-1] == name
+                           for pending_path in self._manifest_ep_path_to_registrations):
+                    self._manifest_pending_names.discard(name)
+
     def get_implementations(self, ep):
         assert not self.exited
+        if self._manifest_pending_names:
+            self._register_from_manifest(ep)
+
         if ep.__class__ in string_types:
             ep = self._name_to_ep[ep]
 
         impls = self._ep_to_impls.get(ep, [])
         ret = []
         for impl, kwargs in impls:
-            class_ = load_class(impl)
+            class_ = self._load_class(impl)
             instance = class_(**kwargs)
             instance.pm = get_weakref(self)
             ret.append(instance)
@@ -148,6 +383,7 @@ class PluginManager(object):
                 impls = register_at[ep] = []
 
         impls.append((impl, kwargs))
+        self._registry_version += 1
 
     def set_instance(self, ep, instance, context=None):
         if ep.__class__ in string_types:
@@ -155,10 +391,9 @@ class PluginManager(object):
         self._name_to_ep[ep.__name__] = ep
 
         instance.pm = get_weakref(self)
-        instances = self._ep_to_context_to_instance.get(ep)
-        if instances is None:
-            instances = self._ep_to_context_to_instance[ep] = {}
+        instances = self._ep_to_context_to_instance.setdefault(ep, {})
         instances[context] = instance
+        self._registry_version += 1
 
     def iter_existing_instances(self, ep):
         if ep.__class__ in string_types:
@@ -167,6 +402,9 @@ class PluginManager(object):
         return compat.itervalues(self._ep_to_context_to_instance[ep])
 
     def has_instance(self, ep, context=None):
+        if self._manifest_pending_names:
+            self._register_from_manifest(ep)
+
         if ep.__class__ in string_types:
             ep = self._name_to_ep.get(ep)
             if ep is None:
@@ -175,6 +413,8 @@ class PluginManager(object):
         try:
             self.get_instance(ep, context)
             return True
+        except AsyncOnlyPluginError:
+            return True
         except NotRegisteredError:
             return False
 
@@ -189,63 +429,362 @@ class PluginManager(object):
         if self.exited:
             raise AssertionError('PluginManager already exited')
 
+        if self._manifest_pending_names:
+            self._register_from_manifest(ep)
+
         if ep.__class__ in string_types:
             ep = self._name_to_ep[ep]
         try:
+            # Note: the path for an already created instance is lock-free.
             return self._ep_to_context_to_instance[ep][context]
         except KeyError:
+            pass
+
+        # Only one thread may create the instance for a given ep/context (the others wait
+        # for it to be created).
+        with self._get_construction_lock(ep, context):
             try:
-                impls = self._ep_to_instance_impls[(ep, context)]
+                return self._ep_to_context_to_instance[ep][context]
             except KeyError:
-                found = False
-                if context is not None:
-                    found = True
-                    try:
-                        impls = self._ep_to_instance_impls[(ep, None)]
-                    except KeyError:
-                        found = False
-                if not found:
-                    if ep in self._ep_to_impls:
-                        # Registered but not a kept instance.
-                        raise NotInstanceError()
-                    else:
-                        # Not registered at all.
-                        raise NotRegisteredError()
-            assert len(impls) == 1
-            impl, kwargs = impls[0]
-            class_ = load_class(impl)
+                return self._create_instance(ep, context)
 
-            instances = self._ep_to_context_to_instance.get(ep)
-            if instances is None:
-                instances = self._ep_to_context_to_instance[ep] = {}
+    def _get_construction_lock(self, ep, context):
+        key = (ep, context)
+        try:
+            return self._construction_locks[key]
+        except KeyError:
+            with self._construction_locks_lock:
+                lock = self._construction_locks.get(key)
+                if lock is None:
+                    lock = self._construction_locks[key] = threading.RLock()
+                return lock
+
+    def _create_instance(self, ep, context):
+        impl, kwargs = self._get_instance_impl(ep, context)
+        class_ = self._load_class(impl)
+        if hasattr(class_, 'plugins_acreate'):
+            raise AsyncOnlyPluginError(
+                '%s can only be created asynchronously (use: await pm.aget_instance(%s)).' % (
+                    impl, ep.__name__))
+
+        ret = class_(**kwargs)
+        return self._publish_instance(ep, context, ret)
+
+    def _publish_instance(self, ep, context, instance):
+        instance.pm = get_weakref(self)
 
-            ret = instances[context] = class_(**kwargs)
-            ret.pm = get_weakref(self)
-            return ret
+        # Note: only made available after it's completely created (as other threads may get
+        # it without locking).
+        instances = self._ep_to_context_to_instance.setdefault(ep, {})
+        instances[context] = instance
+        return instance
+
+    def _get_instance_impl(self, ep, context):
+        '''
+        :return tuple(str, dict):
+            The (impl, kwargs) registered to create the instance for the given ep/context.
+        '''
+        try:
+            impls = self._ep_to_instance_impls[(ep, context)]
+        except KeyError:
+            found = False
+            if context is not None:
+                found = True
+                try:
+                    impls = self._ep_to_instance_impls[(ep, None)]
+                except KeyError:
+                    found = False
+            if not found:
+                if ep in self._ep_to_impls:
+                    # Registered but not a kept instance.
+                    raise NotInstanceError()
+                else:
+                    # Not registered at all.
+                    raise NotRegisteredError()
+        assert len(impls) == 1
+        return impls[0]
 
     __getitem__ = get_instance
 
-    def exit(self):
+    def aget_instance(self, ep, context=None):
+        '''
+        Same as get_instance, but it's a coroutine which also supports implementations which
+        must be created asynchronously (those which define a `plugins_acreate` async classmethod
+        which is called with the registered kwargs and returns the instance).
+
+        I.e.: instance = await pm.aget_instance(EPFoo)
+
+        Note: if multiple coroutines ask for the same instance while it's being created, it's
+        only created once.
+        '''
+        from pyvmmonitor_core.plugins_async import aget_instance
+        return aget_instance(self, ep, context)
+
+    def ainit_instances(self, eps=None):
+        '''
+        Same as init_instances, but it's a coroutine where the instances which don't depend on
+        each other are created concurrently (see: aget_instance).
+        '''
+        from pyvmmonitor_core.plugins_async import ainit_instances
+        return ainit_instances(self, eps)
+
+    def _get_depends(self, class_):
+        '''
+        :return list(EP):
+            The EPs the given implementation class depends on.
+        '''
+        ret = []
+        for ep in getattr(class_, 'plugins_depends', ()):
+            if ep.__class__ in string_types:
+                if self._manifest_pending_names:
+                    self._register_from_manifest(ep)
+                ep = self._name_to_ep.get(ep)
+                if ep is None:
+                    continue  # Nothing registered for it.
+            ret.append(ep)
+        return ret
+
+    def _get_nodes_dependencies(self, nodes, get_class):
+        '''
+        :param list(tuple(EP, object)) nodes:
+            The (ep, context) of the instances.
+
+        :return dict(tuple(EP, object)->list(tuple(EP, object))):
+            The nodes each node depends on (considering the plugins_depends of the
+            implementation classes).
+        '''
+        ep_to_nodes = {}
+        for node in nodes:
+            ep_to_nodes.setdefault(node[0], []).append(node)
+
+        node_to_dependencies = {}
+        for node in nodes:
+            dependencies = node_to_dependencies[node] = []
+            for ep in self._get_depends(get_class(node)):
+                dependencies.extend(ep_to_nodes.get(ep, ()))
+        return node_to_dependencies
+
+    def _get_init_levels(self, eps):
+        '''
+        :return list(list(tuple(EP, object))):
+            The (ep, context) of the instances to be created in init_instances in levels (the
+            instances in a level only depend on instances of previous levels).
+        '''
+        if self._manifest_ep_path_to_registrations:
+            with self._manifest_lock:
+                pending = list(self._manifest_ep_path_to_registrations)
+            for ep_path in pending:
+                self._register_from_manifest(ep_path.rsplit('.', 1)[-1])
+
+        def get_class(node):
+            return self._load_class(self._ep_to_instance_impls[node][0][0])
+
+        nodes = sorted(
+            self._ep_to_instance_impls, key=lambda node: (node[0].__name__, str(node[1])))
+        node_to_dependencies = self._get_nodes_dependencies(nodes, get_class)
+
+        if eps is not None:
+            # Only the given EPs and their dependencies.
+            eps = set(self._name_to_ep[ep] if ep.__class__ in string_types else ep for ep in eps)
+            required = set()
+            pending = [node for node in nodes if node[0] in eps]
+            while pending:
+                node = pending.pop()
+                if node not in required:
+                    required.add(node)
+                    pending.extend(node_to_dependencies[node])
+            nodes = [node for node in nodes if node in required]
+
+        levels, cycle = _get_topological_levels(nodes, node_to_dependencies)
+        if cycle:
+            raise RuntimeError('Cycle found in the plugins dependencies: %s' % (
+                ', '.join('%s (context: %s)' % (ep.__name__, context) for ep, context in cycle),))
+
+        return levels
+
+    def init_instances(self, eps=None, max_workers=None):
+        '''
+        Creates the instances registered with keep_instance=True, creating the instances an
+        implementation depends on (through plugins_depends) before it.
+
+        :param list(EP|str) eps:
+            If given, only the instances of those EPs (and the ones they depend on) are created.
+
+        :param int max_workers:
+            If given, the instances which don't depend on each other are created concurrently in a
+            thread pool with the given number of workers.
+
+        :return list(object):
+            The instances (in the order they were created).
+
+        :raise RuntimeError:
+            If there's a cycle in the dependencies.
+        '''
+        ret = []
+        levels = self._get_init_levels(eps)
+        if max_workers is None:
+            for level in levels:
+                for ep, context in level:
+                    ret.append(self.get_instance(ep, context))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for level in levels:
+                    futures = [executor.submit(self.get_instance, ep, context)
+                               for ep, context in level]
+                    ret.extend(future.result() for future in futures)
+        return ret
+
+    def exit(self, max_workers=None, timeout=None):
+        '''
+        Calls plugins_exit in the instances created (an instance exits before the instances it
+        depends on through plugins_depends).
+
+        :param int max_workers:
+            If given, plugins_exit is called concurrently (in up to the given number of threads)
+            for instances which don't depend on each other.
+
+        :param float timeout:
+            If given, the maximum time to wait for each plugins_exit call (counted from the
+            start of the call). Note: a call which times out isn't interrupted, it's just not
+            waited for anymore (and its thread isn't counted in max_workers anymore). If given
+            and max_workers isn't given, the calls are done one at a time in a separate thread.
+        '''
         try:
             self.on_about_to_exit()
-            for ctx in compat.values(self._ep_to_context_to_instance):
-                for instance in compat.values(ctx):
+            nodes = []
+            for ep, ctx in compat.items(self._ep_to_context_to_instance):
+                for context, instance in compat.items(ctx):
                     if hasattr(instance, 'plugins_exit'):
-                        try:
-                            instance.plugins_exit()
-                        except Exception:
-                            import traceback
-                            traceback.print_exc()
+                        nodes.append((ep, context))
+
+            def get_class(node):
+                return self._ep_to_context_to_instance[node[0]][node[1]].__class__
+
+            # An instance must exit before the instances it depends on (so, the dependencies are
+            # reversed).
+            node_to_dependents = dict((node, []) for node in nodes)
+            for node, dependencies in compat.iteritems(
+                    self._get_nodes_dependencies(nodes, get_class)):
+                for dependency in dependencies:
+                    node_to_dependents[dependency].append(node)
+
+            levels, cycle = _get_topological_levels(nodes, node_to_dependents)
+            if cycle:
+                from pyvmmonitor_core.log_utils import get_logger
+                get_logger(__name__).error(
+                    'Cycle found in the plugins dependencies: %s (exiting those in any order).',
+                    ', '.join('%s (context: %s)' % (ep.__name__, context)
+                              for ep, context in cycle))
+                levels.append(cycle)
+
+            def get_instance(node):
+                return self._ep_to_context_to_instance[node[0]][node[1]]
+
+            if max_workers is None and timeout is None:
+                for level in levels:
+                    for node in level:
+                        _call_plugins_exit(get_instance(node))
+            else:
+                self._exit_in_threads(levels, get_instance, max_workers or 1, timeout)
         finally:
             self.exited = True
             self._ep_to_context_to_instance.clear()
             self._ep_to_impls.clear()
+            self._inject_cache.clear()
+            self._registry_version += 1
+
+    def _exit_in_threads(self, levels, get_instance, max_workers, timeout):
+        # Note: a ThreadPoolExecutor isn't used because a call which times out would still hold
+        # a worker (delaying the calls queued after it and making the next levels run along
+        # with plugins which depend on them).
+        finished = queue.Queue()
+
+        def run(node):
+            try:
+                _call_plugins_exit(get_instance(node))
+            finally:
+                finished.put(node)
+
+        for level in levels:
+            pending = list(reversed(level))
+            running = {}  # node -> deadline
+
+            while pending or running:
+                while pending and len(running) < max_workers:
+                    node = pending.pop()
+                    running[node] = None if timeout is None else time.time() + timeout
+                    t = threading.Thread(target=run, args=(node,), name='plugins_exit')
+                    t.daemon = True
+                    t.start()
+
+                wait_timeout = None
+                if timeout is not None:
+                    wait_timeout = max(0, min(compat.itervalues(running)) - time.time())
+                try:
+                    # Note: calls which timed out before may still be finishing (they're ignored).
+                    running.pop(finished.get(True, wait_timeout), None)
+                except queue.Empty:
+                    now = time.time()
+                    timed_out = [node for node, deadline in compat.iteritems(running)
+                                 if deadline <= now]
+                    for node in timed_out:
+                        del running[node]
+
+                    from pyvmmonitor_core.log_utils import get_logger
+                    get_logger(__name__).error(
+                        'Timed out waiting for plugins_exit of: %s',
+                        ', '.join('%s (context: %s)' % (node[0].__name__, node[1])
+                                  for node in timed_out))
+
+
+def _resolve_injected(pm, inject_kwargs):
+    ret = []
+    for key, val in compat.iteritems(inject_kwargs):
+        if val.__class__ is list:
+            ret.append((key, pm.get_implementations(val[0])))
+        else:
+            ret.append((key, pm.get_instance(val)))
+    return tuple(ret)
+
 
+def inject(__cache__=False, **inject_kwargs):
+    '''
+    :param bool __cache__:
+        If True, the values injected are resolved only once for each PluginManager (and are
+        resolved again only if something is registered in the PluginManager afterwards).
 
-def inject(**inject_kwargs):
+        Note: this means that the lists with implementations (i.e.: @inject(foos=[EPFoo])) will
+        have the same instances in each call (a new list is still passed in each call).
+    '''
 
     def decorator(func):
 
+        if __cache__:
+            # The cache is kept in the PluginManager (so, the values resolved don't outlive it).
+            cache_key = object()
+
+            @functools.wraps(func)
+            def cached_inject_dec(*args, **kwargs):
+                pm = kwargs.get('pm')
+                if pm is None:
+                    raise AssertionError(
+                        'pm argument with PluginManager not passed (required for @inject).')
+
+                cached = pm._inject_cache.get(cache_key)
+                if cached is None or cached[0] != pm._registry_version:
+                    resolved = _resolve_injected(pm, inject_kwargs)
+                    # Note: get the version after resolving (resolving may load registrations
+                    # from a manifest).
+                    cached = pm._inject_cache[cache_key] = (pm._registry_version, resolved)
+
+                for key, val in cached[1]:
+                    if key not in kwargs:
+                        kwargs[key] = list(val) if val.__class__ is list else val
+                return func(*args, **kwargs)
+
+            return cached_inject_dec
+
         @functools.wraps(func)
         def inject_dec(*args, **kwargs):
             pm = kwargs.get('pm')
@@ -0,0 +1,78 @@
+# License: LGPL
+#
+# Copyright: Brainwy Software
+
+'''
+Asynchronous creation of PluginManager instances (usually used through pm.aget_instance and
+pm.ainit_instances).
+
+An implementation which needs to be initialized asynchronously may define a `plugins_acreate`
+async classmethod which receives the registered kwargs and returns the instance -- i.e.:
+
+class ServerImpl(EPServer):
+
+    @classmethod
+    async def plugins_acreate(cls, port):
+        ret = cls()
+        ret.reader, ret.writer = await asyncio.open_connection('127.0.0.1', port)
+        return ret
+
+Note: such implementations can't be created through the (sync) pm.get_instance.
+'''
+import asyncio
+
+from pyvmmonitor_core.plugins import string_types
+
+
+async def _create_instance(pm, ep, context):
+    impl, kwargs = pm._get_instance_impl(ep, context)
+    class_ = pm._load_class(impl)
+    if not hasattr(class_, 'plugins_acreate'):
+        # A regular implementation: get_instance already deals with concurrent creation.
+        return pm.get_instance(ep, context)
+
+    instance = await class_.plugins_acreate(**kwargs)
+    return pm._publish_instance(ep, context, instance)
+
+
+async def aget_instance(pm, ep, context=None):
+    '''
+    See: PluginManager.aget_instance
+    '''
+    if pm.exited:
+        raise AssertionError('PluginManager already exited')
+
+    if pm._manifest_pending_names:
+        pm._register_from_manifest(ep)
+
+    if ep.__class__ in string_types:
+        ep = pm._name_to_ep[ep]
+    try:
+        return pm._ep_to_context_to_instance[ep][context]
+    except KeyError:
+        pass
+
+    key = (ep, context)
+    future = pm._async_creating.get(key)
+    if future is None:
+        future = pm._async_creating[key] = asyncio.ensure_future(
+            _create_instance(pm, ep, context))
+
+        def on_done(future):
+            pm._async_creating.pop(key, None)
+
+        future.add_done_callback(on_done)
+
+    # Note: shielded so that a cancelled caller doesn't cancel the creation for other callers.
+    return await asyncio.shield(future)
+
+
+async def ainit_instances(pm, eps=None):
+    '''
+    See: PluginManager.ainit_instances
+    '''
+    ret = []
+    for level in pm._get_init_levels(eps):
+        ret.extend(await asyncio.gather(
+            *[aget_instance(pm, ep, context) for ep, context in level]))
+    return ret
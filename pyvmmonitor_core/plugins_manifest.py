@@ -0,0 +1,149 @@
+# License: LGPL
+#
+# Copyright: Brainwy Software
+
+'''
+Helpers to create a manifest with the registrations done in a PluginManager (so that at startup
+the manifest can be loaded instead of importing the modules which do the registrations -- the
+implementations are then only imported when first used).
+
+To create the manifest (should be run in a new process so that the modules imported to do the
+registrations can be tracked to check whether the manifest is stale later on):
+
+python -m pyvmmonitor_core.plugins_manifest my_app.plugins.register_plugins my_app.manifest.json
+
+Where my_app.plugins.register_plugins is a function which receives the PluginManager and does the
+registrations (i.e.: pm.register(EPFoo, 'my_app.foo.FooImpl', keep_instance=True)).
+
+To use it:
+
+pm = PluginManager()
+if plugins_manifest.is_manifest_stale('my_app.manifest.json'):
+    register_plugins(pm)
+else:
+    pm.load_manifest('my_app.manifest.json')
+
+Note: the kwargs given to pm.register must be JSON serializable to be put in the manifest.
+'''
+import json
+import os
+import sys
+
+from pyvmmonitor_core import compat
+from pyvmmonitor_core.lazy_loading import load_token
+
+MANIFEST_VERSION = 1
+
+
+def _get_path(cls):
+    return '%s.%s' % (cls.__module__, cls.__name__)
+
+
+class _RecordingPluginManager(object):
+
+    def __init__(self):
+        self.registrations = []
+
+    def register(self, ep, impl, kwargs={}, context=None, keep_instance=False):
+        self.registrations.append({
+            'ep': _get_path(ep),
+            'impl': impl,
+            'kwargs': kwargs,
+            'context': context,
+            'keep_instance': keep_instance,
+        })
+
+
+def _get_source_stat(filename):
+    st = os.stat(filename)
+    return [st.st_mtime, st.st_size]
+
+
+def create_manifest(register, manifest_path):
+    '''
+    :param callable|str register:
+        A callable (or the path to it) which receives a PluginManager and registers the
+        implementations (note: only the register() method is available in the PluginManager
+        received).
+
+    :param str manifest_path:
+        The file where the manifest should be written.
+
+    :return dict:
+        The manifest written.
+    '''
+    initial_modules = set(sys.modules)
+    if register.__class__ in (str, compat.unicode):
+        register = load_token(register)
+
+    pm = _RecordingPluginManager()
+    register(pm)
+
+    # The modules imported to do the registrations are tracked to check whether the manifest
+    # is stale.
+    modules = set(sys.modules).difference(initial_modules)
+    modules.add(register.__module__)
+
+    sources = {}
+    for modname in modules:
+        filename = getattr(sys.modules.get(modname), '__file__', None)
+        if filename and os.path.exists(filename):
+            filename = os.path.abspath(filename)
+            sources[filename] = _get_source_stat(filename)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'registrations': pm.registrations,
+        'sources': sources,
+    }
+    with open(manifest_path, 'w') as stream:
+        json.dump(manifest, stream, indent=1, sort_keys=True)
+    return manifest
+
+
+def read_manifest(manifest_path):
+    with open(manifest_path, 'r') as stream:
+        manifest = json.load(stream)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError('Unexpected manifest version in: %s' % (manifest_path,))
+    return manifest
+
+
+def is_manifest_stale(manifest_path):
+    '''
+    :return bool:
+        True if the manifest doesn't exist, has a different version or if some of the modules
+        which were imported to do the registrations was changed.
+    '''
+    try:
+        manifest = read_manifest(manifest_path)
+    except (IOError, OSError, ValueError):
+        return True
+
+    for filename, stat in compat.iteritems(manifest['sources']):
+        try:
+            if _get_source_stat(filename) != stat:
+                return True
+        except OSError:
+            return True
+    return False
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if len(args) != 2:
+        sys.stderr.write(
+            'Usage: python -m pyvmmonitor_core.plugins_manifest <register_function_path> '
+            '<manifest_path>\n')
+        return 1
+
+    register_path, manifest_path = args
+    manifest = create_manifest(register_path, manifest_path)
+    sys.stdout.write('Wrote %s registrations to: %s\n' % (
+        len(manifest['registrations']), manifest_path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
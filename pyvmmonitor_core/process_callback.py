@@ -0,0 +1,229 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+Helpers to forward Callback emits from one process to another through a multiprocessing
+connection.
+
+To use:
+
+# In the parent process:
+receiver_connection, sender_connection = multiprocessing.Pipe(duplex=False)
+on_sample = Callback()
+receiver = CallbackReceiver(receiver_connection, on_sample)
+# ... start the child process passing sender_connection.
+
+# Periodically (i.e.: in a timer in the main thread):
+receiver.dispatch_pending()
+
+# In the child process:
+sender = CallbackSender(sender_connection)
+sender(sample)  # Or register it in a local Callback: callback.register(sender)
+...
+sender.close()
+
+Emits are put in a bounded queue (so, a producer emitting faster than what can be sent blocks
+until there's space in it) and a thread sends them in batches (if sending fails -- i.e.: the
+receiver was closed -- the pending emits are discarded and emitting or closing raises a
+RuntimeError).
+
+Note: only simple python objects may be passed in an emit, namely:
+int/long/float/complex/str/bytes/bool/None/tuple/list/set.
+'''
+import threading
+
+from pyvmmonitor_core import compat
+from pyvmmonitor_core.log_utils import get_logger
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # Python 2
+
+if compat.PY2:
+    _SIMPLE_TYPES = frozenset(
+        (int, long, float, complex, str, unicode, bool, type(None)))  # @UndefinedVariable
+else:
+    _SIMPLE_TYPES = frozenset((int, float, complex, str, bytes, bool, type(None)))
+
+_CONTAINER_TYPES = frozenset((tuple, list, set, frozenset))
+
+_STOP = object()
+
+# The interval to check whether the sender thread failed while waiting for space in the queue.
+_PUT_CHECK_INTERVAL = .2
+
+logger = get_logger(__name__)
+
+
+def check_simple_object(obj):
+    '''
+    Raises a TypeError if the given object isn't a simple python object (or a container with only
+    simple python objects).
+    '''
+    cls = obj.__class__
+    if cls in _SIMPLE_TYPES:
+        return
+
+    if cls in _CONTAINER_TYPES:
+        for o in obj:
+            check_simple_object(o)
+        return
+
+    raise TypeError('Only simple python objects may be sent to another process (found: %s).' % (
+        cls,))
+
+
+class CallbackSender(object):
+
+    __call_out_of_main_thread__ = True
+
+    def __init__(self, connection, max_batch=100, max_pending=1000):
+        '''
+        :param multiprocessing.connection.Connection connection:
+            The connection used to send the emits.
+
+        :param int max_batch:
+            The maximum number of emits sent at once.
+
+        :param int max_pending:
+            The maximum number of emits waiting to be sent (when reached, emitting blocks until
+            there's space in the queue).
+        '''
+        self._connection = connection
+        self._max_batch = max_batch
+        self._queue = queue.Queue(max_pending)
+        self._closed = False
+        self._send_error = None
+        self._thread = threading.Thread(target=self._send_loop, name='CallbackSender')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __call__(self, *args, **kwargs):
+        if self._closed:
+            raise RuntimeError('CallbackSender already closed.')
+        check_simple_object(args)
+        check_simple_object(tuple(compat.iterkeys(kwargs)))
+        check_simple_object(tuple(compat.itervalues(kwargs)))
+        self._put((args, kwargs))
+
+    def _check_send_error(self):
+        if self._send_error is not None:
+            raise RuntimeError('CallbackSender unable to send emits: %s' % (self._send_error,))
+
+    def _put(self, item):
+        put = self._queue.put
+        while True:
+            self._check_send_error()
+            try:
+                put(item, True, _PUT_CHECK_INTERVAL)
+                return
+            except queue.Full:
+                pass  # Check whether the sender thread is still working and try again.
+
+    def _send_loop(self):
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        max_batch = self._max_batch
+        connection = self._connection
+        stop = False
+
+        try:
+            while not stop:
+                item = get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                while len(batch) < max_batch:
+                    try:
+                        item = get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                connection.send(batch)
+
+            # Notify the receiver that no more emits will be sent.
+            connection.send(None)
+        except Exception as e:
+            logger.exception('Error sending emits in CallbackSender.')
+            self._send_error = e
+
+            # Discard the pending emits so that producers blocked in a put are released (new
+            # emits raise as the error is set).
+            while True:
+                try:
+                    get_nowait()
+                except queue.Empty:
+                    break
+
+    def close(self, timeout=None):
+        '''
+        Sends all the pending emits and notifies the receiver that the sender was closed.
+
+        :raises RuntimeError:
+            If the emits couldn't be sent.
+        '''
+        if not self._closed:
+            self._closed = True
+            self._put(_STOP)
+        self._thread.join(timeout)
+        self._check_send_error()
+
+
+class CallbackReceiver(object):
+
+    def __init__(self, connection, callback):
+        '''
+        :param multiprocessing.connection.Connection connection:
+            The connection from where emits are received.
+
+        :param callable callback:
+            The Callback to be called with the received emits.
+        '''
+        self._connection = connection
+        self._callback = callback
+        self.closed = False
+
+    def dispatch_pending(self, timeout=0, max_batches=None):
+        '''
+        Calls the callback with the emits received.
+
+        :param float timeout:
+            The time to wait for a first batch of emits to be available.
+
+        :param int max_batches:
+            If given, the maximum number of batches dispatched in this call.
+
+        :return int:
+            The number of emits dispatched.
+        '''
+        connection = self._connection
+        callback = self._callback
+        dispatched = 0
+        batches = 0
+
+        while not self.closed and connection.poll(timeout):
+            timeout = 0
+            try:
+                batch = connection.recv()
+            except EOFError:
+                batch = None
+
+            if batch is None:
+                self.closed = True
+                break
+
+            for args, kwargs in batch:
+                callback(*args, **kwargs)
+            dispatched += len(batch)
+
+            batches += 1
+            if max_batches is not None and batches >= max_batches:
+                break
+
+        return dispatched
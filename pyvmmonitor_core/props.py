@@ -1,4 +1,5 @@
 import sys
+from collections import OrderedDict as odict
 from contextlib import contextmanager
 
 from pyvmmonitor_core import compat
@@ -31,7 +32,11 @@ try:
             return
         assert greenlet.getcurrent().parent is None, 'Did not expect to be in a coroutine'
 
+    _has_greenlet = True
+
 except ImportError:
+
+    _has_greenlet = False
 
     # Add no-op version.
     def _assert_not_in_coroutine():
@@ -42,26 +47,208 @@ except ImportError:
         yield
 
 
-def _make_property(key, default):
+def _get_slot_name(key):
+    '''
+    The values of the properties are kept in slots of a values object (see: _get_values_class).
+    '''
+    return '_p_' + key
+
 
-    def get_val(self):
-        return self._props.get(key, default)
+# The _PropsTransaction active (if any).
+_transaction = None
 
-    def set_val(self, val):
-        # Note: coroutines are meant for pure functions, so, they shouldn't change anything.
-        _assert_not_in_coroutine()
-        prev = self._props.get(key, default)
-        self._props[key] = val
-        if prev != val:
-            self._on_modified_callback(self, {key: (val, prev)})
+# Non-empty while a transaction with on_aggregated callbacks is active (in which case the
+# changes of objects without listeners are also given to the transaction).
+_aggregating = []
 
-    return property(get_val, set_val)
+
+def _on_unobserved_modified(obj, attrs):
+    _transaction.on_modified(obj, attrs, None)
+
+
+_GETTER_TEMPLATE = '''
+def get_%(key)s(self):
+    return self._values.%(slot)s
+'''
+
+_SETTER_TEMPLATE = '''
+def set_%(key)s(self, val):
+%(before_set)s
+    dependents = self.__props_dependents__
+    if dependents is not None and %(key)r in dependents:
+        _set_with_dependents(self, %(key)r, %(slot)r, val, dependents[%(key)r]%(changed_arg)s)
+        return
+
+    values = self._values
+    on_modified_callback = self._on_modified_callback
+    if on_modified_callback is None:
+        if not _aggregating:
+            # Fast path: nobody is observing it.
+            values.%(slot)s = val
+            return
+        on_modified_callback = _on_unobserved_modified
+
+    prev = values.%(slot)s
+    values.%(slot)s = val
+    if %(changed_check)s:
+        on_modified_callback(self, {%(key)r: (val, prev)})
+'''
+
+# Note: coroutines are meant for pure functions, so, they shouldn't change anything.
+_ASSERT_NOT_IN_COROUTINE = '''
+    _assert_not_in_coroutine()'''
+
+_CONVERT = '''
+    val = convert(self, val)'''
+
+_SNAPSHOT_VERSION = '''
+    prev_version = self._values.%(version_slot)s
+    version = getattr(val, 'version', None)
+    self._values.%(version_slot)s = version
+
+    def changed(prev, val):
+        return prev is not val or prev_version != version'''
+
+
+def _check_not_in_coroutine():
+    '''
+    The check is only compiled in the setters if greenlet is available and we're in development
+    mode.
+    '''
+    if not _has_greenlet:
+        return False
+    from pyvmmonitor_core import is_development
+    return is_development()
+
+
+def _make_property(key, convert=None, changed=None, version_slot=None):
+    '''
+    Creates the property for a prop (the getter and setter are generated specifically for the
+    given key to avoid paying for closure lookups and setattr with a dynamic name).
+
+    Note: the default isn't needed as the slots of the values object are initialized with the
+    defaults.
+
+    :param callable convert:
+        If given, called as convert(obj, val) to convert the value being set.
+
+    :param callable changed:
+        If given, called as changed(prev, val) to check whether the value was changed (otherwise
+        `prev != val` is used).
+
+    :param str version_slot:
+        If given, the slot where the version of the value is kept (the value is considered
+        changed if it's not the same object or if its version changed).
+    '''
+    slot = _get_slot_name(key)
+
+    before_set = []
+    if _check_not_in_coroutine():
+        before_set.append(_ASSERT_NOT_IN_COROUTINE)
+    if convert is not None:
+        before_set.append(_CONVERT)
+
+    if version_slot is not None:
+        before_set.append(_SNAPSHOT_VERSION % dict(version_slot=version_slot))
+        changed_arg = ', changed'
+        changed_check = 'changed(prev, val)'
+    elif changed is not None:
+        changed_arg = ', changed'
+        changed_check = 'changed(prev, val)'
+    else:
+        changed_arg = ''
+        changed_check = 'prev != val'
+
+    code = (_GETTER_TEMPLATE + _SETTER_TEMPLATE) % dict(
+        key=key,
+        slot=slot,
+        before_set=''.join(before_set),
+        changed_arg=changed_arg,
+        changed_check=changed_check,
+    )
+
+    namespace = {
+        'convert': convert,
+        'changed': changed,
+        '_set_with_dependents': _set_with_dependents,
+        '_aggregating': _aggregating,
+        '_on_unobserved_modified': _on_unobserved_modified,
+        '_assert_not_in_coroutine': _assert_not_in_coroutine,
+    }
+    exec(compile(code, '<props: %s>' % (key,), 'exec'), namespace)
+    return property(namespace['get_' + key], namespace['set_' + key])
+
+
+def _get_version_slot_name(key):
+    '''
+    The slot with the version of the value when it was set (for props compared by 'version').
+    '''
+    return '_pv_' + key
+
+
+def _changed_by_identity(prev, val):
+    return prev is not val
+
+
+def _changed_by_hash(prev, val):
+    # Note: equal hashes may still be a collision (so, fall back to the equality in that case).
+    return prev is not val and (hash(prev) != hash(val) or prev != val)
+
+
+def _changed_always(prev, val):
+    return True
+
+
+_COMPARE_TO_CHANGED = {
+    'equality': None,  # None means that the inlined `prev != val` is used.
+    'identity': _changed_by_identity,
+    'hash': _changed_by_hash,
+    'version': None,  # Handled in the setter (as it needs the version when the value was set).
+}
 
 
 class PropsCustomProperty(object):
+    '''
+    A prop which may convert the values set and which may choose how to detect whether the
+    value was changed (to notify listeners).
+
+    i.e.:
+
+    class Image(PropsObject):
+        PropsObject.declare_props(
+            pixels=PropsCustomProperty(None, compare='identity'),
+        )
+    '''
+
+    def __init__(self, default, compare='equality'):
+        '''
+        :param object default:
+            The default value of the prop.
+
+        :param str|callable compare:
+            How to detect whether a value set is changed (note that values which are
+            considered changed are notified):
+
+            'equality': `prev != val` (the default).
+
+            'identity': `prev is not val` (O(1): meant for big values which aren't changed
+                in-place, i.e.: NumPy arrays, big lists/dicts).
 
-    def __init__(self, default):
+            'hash': `hash(prev) != hash(val)`, falling back to `prev != val` if the hashes are
+                the same (meant for immutable values which cache their hash, such as strings --
+                values which are different usually have different hashes).
+
+            'version': the value must have a `version` attribute which is incremented when
+                it's changed in-place -- it's considered changed if it's not the same object or
+                if the version is not the same one from when it was last set.
+
+            callable: called as compare(prev, val) and should return whether it was changed.
+        '''
         self.default = default
+        if not callable(compare) and compare not in _COMPARE_TO_CHANGED:
+            raise ValueError('Unexpected compare: %r (expected one of: %s or a callable).' % (
+                compare, ', '.join(sorted(_COMPARE_TO_CHANGED))))
+        self.compare = compare
 
     def convert(self, obj, val):
         '''
@@ -69,27 +256,353 @@ class PropsCustomProperty(object):
         '''
         return val
 
-    def _make_property(outer_self, key):  # @NoSelf
+    def _get_changed(self):
+        '''
+        :return callable|NoneType:
+            A callable(prev, val) to check whether the value changed (or None if the equality
+            is used).
+        '''
+        compare = self.compare
+        if callable(compare):
+            return compare
+        return _COMPARE_TO_CHANGED[compare]
+
+    def _get_slots_defaults(self, key):
+        slots_defaults = [(_get_slot_name(key), self.default)]
+        if self.compare == 'version':
+            slots_defaults.append((_get_version_slot_name(key), None))
+        return slots_defaults
+
+    def _make_property(self, key):
+        convert = None
+        if self.__class__.convert != PropsCustomProperty.convert:
+            convert = self.convert
+
+        version_slot = None
+        if self.compare == 'version':
+            version_slot = _get_version_slot_name(key)
+
+        return _make_property(
+            key, convert=convert, changed=self._get_changed(), version_slot=version_slot)
+
+
+_NOT_COMPUTED = object()
+
+_NOT_SET = object()
+
+
+class PropsComputedProperty(object):
+    '''
+    A read-only property whose value is computed from other props (the value is cached and is
+    only computed again when one of the props it depends on is changed).
+
+    When one of the props it depends on is changed, a modified notification is also given for it
+    (if its value changed).
+
+    i.e.:
 
-        default = outer_self.default
+    class Rect(PropsObject):
+        PropsObject.declare_props(
+            w=0,
+            h=0,
+            area=PropsComputedProperty(lambda rect: rect.w * rect.h, depends=('w', 'h')),
+        )
+
+    .. note:: it may only depend on props which aren't computed.
+    '''
+
+    def __init__(self, compute, depends):
+        '''
+        :param callable compute:
+            Called as compute(obj) to compute the value.
+
+        :param list(str) depends:
+            The names of the props used to compute the value.
+        '''
+        self.compute = compute
+        self.depends = tuple(depends)
+
+    def _make_property(outer_self, key):  # @NoSelf
+        compute = outer_self.compute
+        slot = _get_slot_name(key)
 
         def get_val(self):
-            return self._props.get(key, default)
+            values = self._values
+            val = getattr(values, slot)
+            if val is _NOT_COMPUTED:
+                val = compute(self)
+                setattr(values, slot, val)
+            return val
+
+        return property(get_val)
+
+
+def _set_with_dependents(obj, key, slot, val, computed_keys, changed=None):
+    values = obj._values
+    on_modified_callback = obj._on_modified_callback
+    if on_modified_callback is None:
+        if not _aggregating:
+            # Nobody is observing it: just invalidate the computed values (if it changed).
+            prev = getattr(values, slot)
+            setattr(values, slot, val)
+            if (prev != val) if changed is None else changed(prev, val):
+                for computed_key in computed_keys:
+                    setattr(values, _get_slot_name(computed_key), _NOT_COMPUTED)
+            return
+        on_modified_callback = _on_unobserved_modified
+
+    prev = getattr(values, slot)
+    if (prev == val) if changed is None else not changed(prev, val):
+        setattr(values, slot, val)
+        return
+
+    # Get the values (computing them if needed) before the change to notify the old values.
+    computed_old_vals = [(computed_key, getattr(obj, computed_key))
+                         for computed_key in computed_keys]
+    setattr(values, slot, val)
+    for computed_key in computed_keys:
+        setattr(values, _get_slot_name(computed_key), _NOT_COMPUTED)
+
+    on_modified_callback(obj, {key: (val, prev)})
+
+    for computed_key, old_val in computed_old_vals:
+        new_val = getattr(obj, computed_key)
+        if new_val != old_val:
+            on_modified_callback(obj, {computed_key: (new_val, old_val)})
+
+
+_VALUES_TEMPLATE = '''
+def __init__(self):
+    pass
+%(set_defaults)s
+
+
+def _get_state(self):
+    return (%(state_values)s)
+
+
+def _restore(state):
+    values = new(values_class)
+%(set_state)s
+%(set_not_computed)s
+    return values
+'''
+
+
+class _PropsValues(object):
+    '''
+    Base class for the objects which keep the values of the props of a PropsObject (subclasses
+    are created for each PropsObject subclass with a slot for each prop).
+
+    .. note:: the values are kept in a separate object (and not in slots of the PropsObject
+        itself) so that a class may inherit from multiple PropsObject subclasses (which wouldn't
+        be possible if each of those added slots to the instance layout).
+    '''
+
+    __slots__ = []
+
+    # tuple(tuple(key, slot, default)) with the (non-computed) props.
+    __props_defaults__ = ()
+
+    # tuple(str) with the slots which are kept when cloning/pickling (the slots with cached
+    # computed values are reset).
+    __props_state_slots__ = ()
+
+    def _get_state(self):
+        '''
+        :return tuple:
+            The values in the __props_state_slots__.
+        '''
+
+    @staticmethod
+    def _restore(state):
+        '''
+        :return _PropsValues:
+            A new instance with the values gotten from _get_state.
+        '''
+
+
+def _get_values_class(cls):
+    '''
+    :return type:
+        The _PropsValues subclass with the slots for the props of the given PropsObject subclass
+        (the slots are initialized with the defaults when it's instanced, so, reading a prop
+        which wasn't set is as fast as reading one which was set).
+    '''
+    values_class = cls.__dict__.get('__props_values_class__')
+    if values_class is None:
+        slot_to_default = odict()
+        keys = []
+        for base_class in reversed(cls.__mro__):
+            for slot, default in base_class.__dict__.get('__props_own_values__', ()):
+                slot_to_default[slot] = default
+            keys.extend(base_class.__dict__.get('__props__', ()))
+
+        namespace = {'new': object.__new__, '_NOT_COMPUTED': _NOT_COMPUTED}
+        set_defaults = []
+        state_slots = []
+        set_not_computed = []
+        for i, (slot, default) in enumerate(compat.iteritems(slot_to_default)):
+            namespace['default%s' % (i,)] = default
+            set_defaults.append('    self.%s = default%s' % (slot, i))
+            if default is _NOT_COMPUTED:
+                set_not_computed.append('    values.%s = _NOT_COMPUTED' % (slot,))
+            else:
+                state_slots.append(slot)
+
+        code = _VALUES_TEMPLATE % dict(
+            set_defaults='\n'.join(set_defaults),
+            state_values=''.join('self.%s, ' % (slot,) for slot in state_slots),
+            set_state=('    %s= state' % ''.join('values.%s, ' % (slot,) for slot in state_slots)
+                       if state_slots else ''),
+            set_not_computed='\n'.join(set_not_computed),
+        )
+        exec(compile(code, '<props values: %s>' % (cls.__name__,), 'exec'), namespace)
+
+        props_defaults = []
+        for key in odict.fromkeys(keys):
+            slot = _get_slot_name(key)
+            props_defaults.append((key, slot, slot_to_default[slot]))
 
-        def set_val(self, val):
-            # Note: coroutines are meant for pure functions, so, they shouldn't
-            # change anything.
-            _assert_not_in_coroutine()
-            val = outer_self.convert(self, val)
+        values_class = namespace['values_class'] = type(
+            cls.__name__ + 'Values', (_PropsValues,), {
+                '__slots__': list(slot_to_default),
+                '__init__': namespace['__init__'],
+                '_get_state': namespace['_get_state'],
+                '_restore': staticmethod(namespace['_restore']),
+                '__props_defaults__': tuple(props_defaults),
+                '__props_state_slots__': tuple(state_slots),
+            })
+        # Note: checked in cls.__dict__ because a subclass may add new props.
+        cls.__props_values_class__ = values_class
+    return values_class
 
-            # Note: we're choosing to copy/paste the global "_make_property" to avoid
-            # paying a function call.
-            prev = self._props.get(key, default)
-            self._props[key] = val
-            if prev != val:
-                self._on_modified_callback(self, {key: (val, prev)})
 
-        return property(get_val, set_val)
+# The slots of PropsObject which aren't copied as the other instance slots when cloning/pickling
+# (note: _props is always set -- to None if not used -- and is handled separately).
+_INTERNAL_SLOTS = frozenset((
+    '_props', '_on_modified_callback', '_original_on_modified_callback', '_values',
+    '__weakref__', '__dict__'))
+
+
+def _get_instance_slots(cls):
+    '''
+    :return tuple(str):
+        The slots of instances of the given PropsObject subclass which are kept when
+        cloning/pickling (i.e.: the ones added with PropsObject.add_slot).
+    '''
+    instance_slots = cls.__dict__.get('__props_instance_slots__')
+    if instance_slots is None:
+        instance_slots = []
+        for base_class in cls.__mro__:
+            slots = base_class.__dict__.get('__slots__', ())
+            if isinstance(slots, (str, compat.unicode)):
+                slots = (slots,)
+            for slot in slots:
+                if slot in _INTERNAL_SLOTS:
+                    continue
+                if slot.startswith('__') and not slot.endswith('__'):
+                    slot = '_%s%s' % (base_class.__name__.lstrip('_'), slot)  # Name mangling.
+                instance_slots.append(slot)
+        instance_slots = tuple(instance_slots)
+        # Note: checked in cls.__dict__ because a subclass may add new slots.
+        cls.__props_instance_slots__ = instance_slots
+    return instance_slots
+
+
+def _get_instance_state(obj):
+    '''
+    :return tuple(tuple(str, object)):
+        The (slot, value) for the instance slots which are set (and ('__dict__', dict) if the
+        instance has a __dict__).
+    '''
+    state = []
+    if obj._props is not None:
+        state.append(('_props', obj._props))
+
+    for slot in _get_instance_slots(obj.__class__):
+        val = getattr(obj, slot, _NOT_SET)
+        if val is not _NOT_SET:
+            state.append((slot, val))
+
+    obj_dict = getattr(obj, '__dict__', None)
+    if obj_dict:
+        state.append(('__dict__', obj_dict.copy()))
+    return tuple(state)
+
+
+def _set_instance_state(obj, instance_state):
+    for slot, val in instance_state:
+        if slot == '__dict__':
+            obj.__dict__.update(val)
+        else:
+            setattr(obj, slot, val)
+
+
+def _restore_values(values_class, state_slots, state):
+    if state_slots == values_class.__props_state_slots__:
+        return values_class._restore(state)
+
+    # The props of the class changed after the state was saved.
+    values = values_class()
+    all_slots = frozenset(values_class.__slots__)
+    for slot, val in compat.izip(state_slots, state):
+        if slot in all_slots:
+            setattr(values, slot, val)
+    return values
+
+
+def _new_props_object(cls, values, instance_state):
+    obj = cls.__new__(cls)
+    obj._props = obj._original_on_modified_callback = obj._on_modified_callback = None
+    obj._values = values
+    if instance_state:
+        _set_instance_state(obj, instance_state)
+    return obj
+
+
+class _PropsDependents(object):
+    '''
+    Descriptor which computes (and caches in the class) a dict(prop name->computed props names
+    which depend on it) considering the computed props of the class and its base classes.
+    '''
+
+    def __get__(self, obj, cls):
+        dependents = {}
+        for base_class in reversed(cls.__mro__):
+            for computed_key, depends in compat.iteritems(
+                    base_class.__dict__.get('__props_own_dependencies__', {})):
+                for key in depends:
+                    dependents.setdefault(key, []).append(computed_key)
+
+        dependents = dict((key, tuple(val)) for key, val in compat.iteritems(dependents))
+        if not dependents:
+            dependents = None
+        cls.__props_dependents__ = dependents
+        return dependents
+
+
+def _is_computed_prop(cls, key):
+    for base_class in cls.__mro__:
+        if key in base_class.__dict__.get('__props_own_dependencies__', ()):
+            return True
+    return False
+
+
+def _get_props_changed(cls):
+    '''
+    :return dict(str->callable):
+        The props of the class which aren't compared by equality -> callable(prev, val) to
+        check whether it was changed.
+    '''
+    props_changed = cls.__dict__.get('__props_changed__')
+    if props_changed is None:
+        props_changed = {}
+        for base_class in reversed(cls.__mro__):
+            props_changed.update(base_class.__dict__.get('__props_own_changed__', {}))
+        # Note: checked in cls.__dict__ because a subclass may add new props.
+        cls.__props_changed__ = props_changed
+    return props_changed
 
 
 class _ModifiedCallbackKeeper(object):
@@ -98,18 +611,88 @@ class _ModifiedCallbackKeeper(object):
         self._new_val_old_vals = {}
 
     def __call__(self, obj, attrs):
+        props_changed = _get_props_changed(obj.__class__)
         for key, (new_val, old_val) in compat.iteritems(attrs):
             prev_notification = self._new_val_old_vals.get(key)
             if prev_notification is not None:
                 old_val = prev_notification[1]
 
-            if new_val == old_val:
+            changed = props_changed.get(key)
+            if (new_val == old_val) if changed is None else not changed(old_val, new_val):
                 self._new_val_old_vals.pop(key)
             else:
                 self._new_val_old_vals[key] = (new_val, old_val)
 
     def notify(self, obj, original_callback):
         original_callback(obj, self._new_val_old_vals)
+
+
+class _ModifiedCallback(Callback):
+    '''
+    The callback used for the modified notifications of a PropsObject: besides the listeners
+    interested in any change, keeps an index of listeners interested only in some props.
+    '''
+
+    __slots__ = ['_key_to_callback']
+
+    def __init__(self):
+        Callback.__init__(self)
+        self._key_to_callback = None
+
+    def register_for_keys(self, func, keys):
+        key_to_callback = self._key_to_callback
+        if key_to_callback is None:
+            key_to_callback = self._key_to_callback = {}
+
+        for key in keys:
+            callback = key_to_callback.get(key)
+            if callback is None:
+                callback = key_to_callback[key] = Callback()
+            callback.register(func)
+
+    def unregister(self, func):
+        Callback.unregister(self, func)
+        if self._key_to_callback:
+            for callback in compat.itervalues(self._key_to_callback):
+                callback.unregister(func)
+
+    def unregister_all(self):
+        Callback.unregister_all(self)
+        self._key_to_callback = None
+
+    def __call__(self, obj, attrs):  # @DontTrace
+        if _transaction is not None:
+            _transaction.on_modified(obj, attrs, self)
+            return
+
+        if self._callbacks:
+            self._call_listeners(obj, attrs)
+
+        key_to_callback = self._key_to_callback
+        if not key_to_callback:
+            return
+
+        if len(attrs) == 1:
+            for key in attrs:
+                callback = key_to_callback.get(key)
+                if callback is not None:
+                    callback(obj, attrs)
+            return
+
+        # Multiple keys changed: a listener interested in more than one of those must be
+        # called only once.
+        to_call = odict()
+        for key in attrs:
+            callback = key_to_callback.get(key)
+            if callback is not None:
+                for func in callback._calculate_to_call():
+                    to_call.setdefault(callback._get_key(func), func)
+
+        for func in compat.itervalues(to_call):
+            try:
+                func(obj, attrs)
+            except Exception:  # Show it but don't propagate.
+                sys.excepthook(*sys.exc_info())
 
 
 class PropsObject(object):
@@ -130,9 +713,22 @@ class PropsObject(object):
             print('new x', new_val, 'old_x', old_val)
 
     point.register_modified(on_modified)
+
+    # It's also possible to be notified only when some of the props change:
+    point.register_modified(on_modified, props=('x',))
     '''
 
-    __slots__ = ['_props', '_on_modified_callback', '__weakref__', '_original_on_modified_callback']
+    __slots__ = [
+        '_props',
+        '_on_modified_callback',
+        '__weakref__',
+        '_original_on_modified_callback',
+        '_values',  # The _PropsValues with the values of the props.
+    ]
+
+    # dict(prop name->computed props names) for the props with dependent computed props (or
+    # None if there are no computed props).
+    __props_dependents__ = None
 
     @classmethod
     def declare_props(cls, **kwargs):
@@ -143,11 +739,34 @@ class PropsObject(object):
         if props_namespace is None:
             props_namespace = namespace['__props__'] = []
 
+        own_values = namespace.get('__props_own_values__')
+        if own_values is None:
+            own_values = namespace['__props_own_values__'] = []
+
         for key, val in compat.iteritems(kwargs):
+            if isinstance(val, PropsComputedProperty):
+                own_values.append((_get_slot_name(key), _NOT_COMPUTED))
+                namespace[key] = val._make_property(key)
+                dependencies = namespace.get('__props_own_dependencies__')
+                if dependencies is None:
+                    dependencies = namespace['__props_own_dependencies__'] = {}
+                dependencies[key] = val.depends
+                namespace['__props_dependents__'] = _PropsDependents()
+                continue
+
             if isinstance(val, PropsCustomProperty):
+                own_values.extend(val._get_slots_defaults(key))
                 namespace[key] = val._make_property(key)
+                if val.compare != 'equality':
+                    own_changed = namespace.get('__props_own_changed__')
+                    if own_changed is None:
+                        own_changed = namespace['__props_own_changed__'] = {}
+                    # When merging notifications there's no version to compare to: consider
+                    # it always changed.
+                    own_changed[key] = val._get_changed() or _changed_always
             else:
-                namespace[key] = _make_property(key, val)
+                own_values.append((_get_slot_name(key), val))
+                namespace[key] = _make_property(key)
             props_namespace.append(key)
 
         if '__slots__' not in namespace:
@@ -157,26 +776,69 @@ class PropsObject(object):
     def add_slot(cls, slot):
         frame = sys._getframe().f_back
         namespace = frame.f_locals
-        namespace['__slots__'].append(slot)
+        slots = namespace.get('__slots__')
+        if slots is None:
+            namespace['__slots__'] = [slot]
+        elif isinstance(slots, list):
+            slots.append(slot)
+        else:
+            if isinstance(slots, (str, compat.unicode)):
+                slots = (slots,)
+            namespace['__slots__'] = tuple(slots) + (slot,)
 
     def __init__(self, **kwargs):
-        self._props = {}
-        self._original_on_modified_callback = self._on_modified_callback = Callback()
+        # Note: the callback is only created when some listener is registered.
+        self._props = self._original_on_modified_callback = self._on_modified_callback = None
+        values_class = self.__class__.__dict__.get('__props_values_class__')
+        if values_class is None:
+            values_class = _get_values_class(self.__class__)
+        self._values = values_class()
         for key, val in compat.iteritems(kwargs):
             setattr(self, key, val)
 
-    def register_modified(self, on_modified):
-        self._original_on_modified_callback.register(on_modified)
+    def register_modified(self, on_modified, props=None):
+        '''
+        :param callable on_modified:
+            Called as on_modified(obj, attrs) where attrs is a dict(key->(new_val, old_val)).
+
+        :param list(str) props:
+            If given, on_modified is only called when one of the given props is modified.
+        '''
+        callback = self._original_on_modified_callback
+        if callback is None:
+            callback = self._original_on_modified_callback = _ModifiedCallback()
+            if self._on_modified_callback is None:
+                # i.e.: if it's not None we're in a delayed_notifications.
+                self._on_modified_callback = callback
+
+        if props is None:
+            callback.register(on_modified)
+        else:
+            if isinstance(props, (str, compat.unicode)):
+                raise TypeError('Expected a list of props names (found: %r).' % (props,))
+            all_props = self.get_all_props_names()
+            for key in props:
+                if key not in all_props and not _is_computed_prop(self.__class__, key):
+                    raise ValueError('%s is not a prop of %s.' % (key, self.__class__.__name__))
+            callback.register_for_keys(on_modified, props)
 
     def unregister_modified(self, on_modified):
-        self._original_on_modified_callback.unregister(on_modified)
+        callback = self._original_on_modified_callback
+        if callback is not None:
+            callback.unregister(on_modified)
 
     def create_memento(self):
         '''
         Note that the memento only includes the properties which were changed. To get all properties
         use get_props_as_dict.
         '''
-        return dict((attr, getattr(self, attr)) for attr in self._props)
+        ret = {}
+        values = self._values
+        for key, slot, default in values.__props_defaults__:
+            val = getattr(values, slot)
+            if val is not default:
+                ret[key] = val
+        return ret
 
     def set_memento(self, memento):
         for key, val in compat.iteritems(memento):
@@ -202,12 +864,57 @@ class PropsObject(object):
 
         return all_props
 
+    @classmethod
+    def _get_props_slots(cls):
+        '''
+        :return tuple(tuple(str, str)):
+            A tuple with (key, slot name) for all the props of the class.
+        '''
+        props_slots = cls.__dict__.get('__props_slots__')
+        if props_slots is None:
+            props_slots = tuple(
+                (key, _get_slot_name(key)) for key in sorted(cls.get_all_props_names()))
+            # Note: checked in cls.__dict__ because a subclass may add new props.
+            cls.__props_slots__ = props_slots
+        return props_slots
+
     def get_props_as_dict(self):
         ret = {}
         for prop in self.get_all_props_names():
             ret[prop] = getattr(self, prop)
         return ret
 
+    def clone(self):
+        '''
+        :return PropsObject:
+            A new instance with the same props and slots (the values are copied directly:
+            __init__ isn't called, no notifications are given and listeners aren't copied).
+
+        .. see:: clone_many to clone many objects at once.
+        '''
+        return clone_many((self,))[0]
+
+    # Note: when unpickling, __init__ isn't called and listeners aren't pickled (the default
+    # __reduce_ex__ is kept as it's faster than a __reduce__ implemented in Python).
+    def __getstate__(self):
+        values = self._values
+        return (values.__props_state_slots__, values._get_state(), _get_instance_state(self))
+
+    def __setstate__(self, state):
+        self._props = self._original_on_modified_callback = self._on_modified_callback = None
+        values_class = _get_values_class(self.__class__)
+        if state.__class__ is dict:
+            # A memento (i.e.: from a PropsJournalReplayer or pickled by a previous version).
+            values = self._values = values_class()
+            for key, val in compat.iteritems(state):
+                setattr(values, _get_slot_name(key), val)
+            return
+
+        state_slots, values_state, instance_state = state
+        self._values = _restore_values(values_class, state_slots, values_state)
+        if instance_state:
+            _set_instance_state(self, instance_state)
+
     @classmethod
     def delegate_to_props(cls, *props):
         frame = sys._getframe().f_back
@@ -217,6 +924,91 @@ class PropsObject(object):
             namespace[prop] = _make_delegator_property(prop)
 
 
+def clone_many(props_objects):
+    '''
+    :param iterable(PropsObject) props_objects:
+        The objects to be cloned.
+
+    :return list(PropsObject):
+        The clones of the given objects (see: PropsObject.clone).
+    '''
+    ret = []
+    for obj in props_objects:
+        values = obj._values
+        ret.append(_new_props_object(
+            obj.__class__, values._restore(values._get_state()), _get_instance_state(obj)))
+    return ret
+
+
+def dumps_many(props_objects, protocol=None):
+    '''
+    Pickles many PropsObjects at once (faster than pickling a list of PropsObjects as the
+    classes and the names of the slots are only pickled once and the values of each object are
+    pickled as a tuple).
+
+    :param iterable(PropsObject) props_objects:
+        The objects to be pickled.
+
+    :param int protocol:
+        The pickle protocol (if not given, the highest protocol is used).
+
+    :return bytes:
+        The data to be passed to loads_many.
+    '''
+    import pickle
+    if protocol is None:
+        protocol = pickle.HIGHEST_PROTOCOL
+
+    classes = []  # list(tuple(class, state slots))
+    class_to_index = {}
+    class_indexes = []
+    states = []
+    instance_states = []
+    for obj in props_objects:
+        cls = obj.__class__
+        index = class_to_index.get(cls)
+        if index is None:
+            index = class_to_index[cls] = len(classes)
+            classes.append((cls, obj._values.__props_state_slots__))
+        class_indexes.append(index)
+        states.append(obj._values._get_state())
+        instance_states.append(_get_instance_state(obj))
+
+    if not any(instance_states):
+        instance_states = None
+    return pickle.dumps((classes, class_indexes, states, instance_states), protocol)
+
+
+def loads_many(data):
+    '''
+    :param bytes data:
+        The data gotten from dumps_many.
+
+    :return list(PropsObject):
+        The objects unpickled.
+    '''
+    import pickle
+    classes, class_indexes, states, instance_states = pickle.loads(data)
+
+    restore = []
+    for cls, state_slots in classes:
+        values_class = _get_values_class(cls)
+        if state_slots == values_class.__props_state_slots__:
+            restore.append((cls, values_class._restore))
+        else:
+            restore.append((cls, lambda state, values_class=values_class, state_slots=state_slots:
+                            _restore_values(values_class, state_slots, state)))
+
+    if instance_states is None:
+        instance_states = ((),) * len(states)
+
+    ret = []
+    for index, state, instance_state in compat.izip(class_indexes, states, instance_states):
+        cls, restore_values = restore[index]
+        ret.append(_new_props_object(cls, restore_values(state), instance_state))
+    return ret
+
+
 @contextmanager
 def delayed_notifications(props_obj):
     original = props_obj._on_modified_callback
@@ -225,8 +1017,93 @@ def delayed_notifications(props_obj):
     try:
         yield
     finally:
+        if original is None:
+            # A listener may have been registered while the notifications were delayed.
+            original = props_obj._original_on_modified_callback
         props_obj._on_modified_callback = original
-        modified_callback_keeper.notify(props_obj, original)
+        if original is not None:
+            modified_callback_keeper.notify(props_obj, original)
+        elif _aggregating and modified_callback_keeper._new_val_old_vals:
+            modified_callback_keeper.notify(props_obj, _on_unobserved_modified)
+
+
+class _PropsTransaction(object):
+
+    def __init__(self):
+        # id(obj) -> (obj, original modified callback or None, _ModifiedCallbackKeeper)
+        self._touched = odict()
+        self.on_aggregated_callbacks = []
+
+    def add_on_aggregated(self, on_aggregated):
+        self.on_aggregated_callbacks.append(on_aggregated)
+        if not _aggregating:
+            _aggregating.append(self)
+
+    def on_modified(self, obj, attrs, original):
+        touched = self._touched.get(id(obj))
+        if touched is not None:
+            # The original callback may still be called by a setter which got it before the
+            # keeper was set (i.e.: when notifying computed props).
+            keeper = touched[2]
+        else:
+            # The first notification of an object: from now on, it'll notify the keeper directly.
+            keeper = _ModifiedCallbackKeeper()
+            self._touched[id(obj)] = (obj, original, keeper)
+            obj._on_modified_callback = keeper
+        keeper(obj, attrs)
+
+    def flush(self):
+        del _aggregating[:]
+
+        changes = []
+        for obj, original, keeper in compat.itervalues(self._touched):
+            if original is None:
+                # A listener may have been registered in the transaction.
+                original = obj._original_on_modified_callback
+            obj._on_modified_callback = original
+            if keeper._new_val_old_vals:
+                changes.append((obj, original, keeper._new_val_old_vals))
+        self._touched.clear()
+
+        for obj, original, attrs in changes:
+            if original is not None:
+                original(obj, attrs)
+
+        if self.on_aggregated_callbacks:
+            aggregated = [(obj, attrs) for (obj, _original, attrs) in changes]
+            for on_aggregated in self.on_aggregated_callbacks:
+                on_aggregated(aggregated)
+
+
+@contextmanager
+def transaction(on_aggregated=None):
+    '''
+    Delays the notifications of all the PropsObjects changed in the context: at the end, the
+    changes are merged and notified for each object (as in delayed_notifications).
+
+    :param callable on_aggregated:
+        If given, it's called at the end as on_aggregated(list(tuple(obj, attrs))) with the
+        changes of all the objects -- including the ones without listeners (after the
+        notifications of each object are given).
+
+    .. note:: if a transaction is already active, the changes are notified when the outermost
+        transaction finishes.
+    '''
+    global _transaction
+    if _transaction is not None:
+        if on_aggregated is not None:
+            _transaction.add_on_aggregated(on_aggregated)
+        yield
+        return
+
+    _transaction = props_transaction = _PropsTransaction()
+    if on_aggregated is not None:
+        props_transaction.add_on_aggregated(on_aggregated)
+    try:
+        yield
+    finally:
+        _transaction = None
+        props_transaction.flush()
 
 
 def _make_delegator_property(key):
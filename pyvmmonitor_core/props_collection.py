@@ -0,0 +1,299 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+A collection which keeps the props declared in a PropsObject subclass as NumPy columns (so, it's
+possible to get/set the values of many objects at once).
+
+To use:
+
+class Point(PropsObject):
+    PropsObject.declare_props(x=0., y=0.)
+
+points = PropsCollection(Point, 200000)
+
+def on_modified(collection, key_to_indices):
+    if 'x' in key_to_indices:
+        print('x changed at indices:', key_to_indices['x'])
+
+points.register_modified(on_modified)
+
+points.set_values('x', xs)  # A single notification with the indices changed.
+points.update({'x': xs, 'y': ys}, indices=[1, 2, 3])  # Also a single notification.
+
+point = points[10]  # A view of the row 10 (point.x, point.y are read/written in the columns).
+point.x = 20
+
+Note: NumPy is required to use this module.
+'''
+from contextlib import contextmanager
+
+from pyvmmonitor_core import compat
+from pyvmmonitor_core.callback import Callback
+
+if compat.PY2:
+    _INTEGER_TYPES = (int, long)  # @UndefinedVariable
+else:
+    _INTEGER_TYPES = (int,)
+
+
+def _get_default_dtype(default):
+    import numpy
+    if isinstance(default, bool):
+        return bool
+    if isinstance(default, _INTEGER_TYPES):
+        # Props declared with an int default (i.e.: x=0) usually also receive floats, which
+        # would be truncated in an integer column.
+        return numpy.float64
+    if isinstance(default, (float, complex)):
+        return numpy.asarray(default).dtype
+    return object
+
+
+def _as_column_values(column, values):
+    '''
+    :return numpy.ndarray|object:
+        The values converted to the dtype of the column (so that they can be compared with the
+        values in the column to know whether they changed).
+
+    :raises TypeError:
+        If the values can't be converted without losing data (i.e.: floats in an integer
+        column).
+    '''
+    import numpy
+    if column.dtype == object:
+        return values
+
+    values = numpy.asarray(values)
+    if not numpy.can_cast(values.dtype, column.dtype, casting='same_kind'):
+        raise TypeError('Unable to set values of dtype %s in a column of dtype %s.' % (
+            values.dtype, column.dtype))
+    return values.astype(column.dtype, copy=False)
+
+
+def _get_props_defaults(props_class):
+    instance = props_class()
+    return [(key, getattr(instance, key)) for key, _slot in props_class._get_props_slots()]
+
+
+def _make_row_property(key):
+
+    def get_val(self):
+        return self._collection._columns[key].item(self._index)
+
+    def set_val(self, val):
+        self._collection.set_value(key, self._index, val)
+
+    return property(get_val, set_val)
+
+
+def _get_row_class(props_class):
+    row_class = props_class.__dict__.get('__props_row_class__')
+    if row_class is None:
+        namespace = {'__slots__': ['_collection', '_index']}
+        for key, _slot in props_class._get_props_slots():
+            namespace[key] = _make_row_property(key)
+        row_class = type(props_class.__name__ + 'Row', (PropsRow,), namespace)
+        props_class.__props_row_class__ = row_class
+    return row_class
+
+
+class PropsRow(object):
+    '''
+    A view to a row in a PropsCollection (subclasses have properties for each declared prop).
+    '''
+
+    __slots__ = []
+
+    def __init__(self, collection, index):
+        self._collection = collection
+        self._index = index
+
+    @property
+    def index(self):
+        return self._index
+
+    def get_props_as_dict(self):
+        return dict(
+            (key, column.item(self._index))
+            for key, column in compat.iteritems(self._collection._columns))
+
+
+class PropsCollection(object):
+
+    def __init__(self, props_class, size, dtypes=None):
+        '''
+        :param type props_class:
+            The PropsObject subclass with the declared props.
+
+        :param int size:
+            The number of rows in the collection (all with the default values).
+
+        :param dict(str->dtype) dtypes:
+            The dtype to be used for a given prop (if not given, it's computed based on the
+            default: bool, int and float defaults use a bool, float64 and float64 dtype, complex
+            defaults use a complex dtype and others an object dtype).
+
+        .. note:: setting values which can't be converted to the dtype of the column without
+            losing data (i.e.: floats in an integer column) raises a TypeError.
+        '''
+        import numpy
+
+        self.props_class = props_class
+        self._size = size
+        self._columns = {}
+        self._on_modified_callback = None
+        self._delayed = None
+        self._row_class = _get_row_class(props_class)
+
+        if dtypes is None:
+            dtypes = {}
+
+        for key, default in _get_props_defaults(props_class):
+            dtype = dtypes.get(key)
+            if dtype is None:
+                dtype = _get_default_dtype(default)
+            column = numpy.empty(size, dtype=dtype)
+            column.fill(default)
+            self._columns[key] = column
+
+    @classmethod
+    def from_objects(cls, props_class, objects, dtypes=None):
+        '''
+        Creates a collection with the values of the given PropsObjects.
+        '''
+        objects = list(objects)
+        ret = cls(props_class, len(objects), dtypes)
+        for key, column in compat.iteritems(ret._columns):
+            for i, obj in enumerate(objects):
+                column[i] = getattr(obj, key)
+        return ret
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('Index out of range: %s' % (index,))
+        return self._row_class(self, index)
+
+    def __iter__(self):
+        row_class = self._row_class
+        for i in compat.xrange(self._size):
+            yield row_class(self, i)
+
+    def get_props_names(self):
+        return frozenset(self._columns)
+
+    def get_values(self, key, indices=None):
+        '''
+        :return numpy.ndarray:
+            The values for the given prop (note: the values must not be changed directly in the
+            returned array as it may be a view of the column -- use set_values/update).
+        '''
+        column = self._columns[key]
+        if indices is None:
+            return column
+        return column[indices]
+
+    def set_value(self, key, index, value):
+        column = self._columns[key]
+        value = _as_column_values(column, value)
+        if column[index] != value:
+            import numpy
+            column[index] = value
+            self._notify({key: numpy.array([index])})
+
+    def set_values(self, key, values, indices=None):
+        self.update({key: values}, indices)
+
+    def update(self, key_to_values, indices=None):
+        '''
+        Sets the values of multiple props at once (a single notification is given with the
+        indices which were actually changed for each prop).
+
+        :param dict(str->array-like) key_to_values:
+            The values to set for each prop.
+
+        :param array-like indices:
+            The indices where the values should be set (if None, the values are set to all
+            the rows).
+        '''
+        import numpy
+
+        if indices is not None:
+            indices = numpy.asarray(indices)
+            if indices.dtype == bool:
+                indices = numpy.flatnonzero(indices)
+
+        # Note: all the values are converted/compared before setting any of them (so that
+        # nothing is changed if some of the values can't be set).
+        to_set = []
+        for key, values in compat.iteritems(key_to_values):
+            column = self._columns[key]
+            values = _as_column_values(column, values)
+            if indices is None:
+                key_changed = numpy.flatnonzero(column != values)
+            else:
+                key_changed = indices[numpy.flatnonzero(column[indices] != values)]
+            to_set.append((key, column, values, key_changed))
+
+        changed = {}
+        for key, column, values, key_changed in to_set:
+            if indices is None:
+                column[:] = values
+            else:
+                column[indices] = values
+
+            if len(key_changed):
+                changed[key] = key_changed
+
+        if changed:
+            self._notify(changed)
+
+    def _notify(self, changed):
+        delayed = self._delayed
+        if delayed is not None:
+            import numpy
+            for key, indices in compat.iteritems(changed):
+                prev = delayed.get(key)
+                if prev is not None:
+                    indices = numpy.union1d(prev, indices)
+                delayed[key] = indices
+            return
+
+        if self._on_modified_callback is not None:
+            self._on_modified_callback(self, changed)
+
+    @contextmanager
+    def delayed_notifications(self):
+        '''
+        Any change done in the context will be notified in a single notification at the end.
+        '''
+        if self._delayed is not None:
+            yield  # Already delaying notifications.
+            return
+
+        self._delayed = delayed = {}
+        try:
+            yield
+        finally:
+            self._delayed = None
+            if delayed:
+                self._notify(delayed)
+
+    def register_modified(self, on_modified):
+        '''
+        :param callable on_modified:
+            Called as on_modified(collection, dict(key->indices changed)).
+        '''
+        if self._on_modified_callback is None:
+            self._on_modified_callback = Callback()
+        self._on_modified_callback.register(on_modified)
+
+    def unregister_modified(self, on_modified):
+        if self._on_modified_callback is not None:
+            self._on_modified_callback.unregister(on_modified)
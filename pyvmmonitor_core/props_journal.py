@@ -0,0 +1,387 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+Helpers to record the changes of PropsObjects to a file (i.e.: in a profiling session) and to
+rebuild the state of the objects at a given time later on.
+
+To use:
+
+recorder = PropsJournalRecorder('session.journal')
+recorder.track(point1)
+recorder.track(point2)
+...
+recorder.close()
+
+# Later on:
+replayer = PropsJournalReplayer('session.journal')
+id_to_state = replayer.get_states(at_time)  # dict(id->(class path, dict(key->val)))
+id_to_obj = replayer.create_objects(at_time)  # dict(id->PropsObject)
+replayer.close()
+
+The changes are collected in the thread doing the change and a writer thread serializes and writes
+them in batches (to a memory-mapped file which is grown as needed).
+
+Each record is a header (struct) followed by a payload (marshal). From time to time the writer
+also writes a checkpoint record (with the state of all the tracked objects) and its time/offset
+to a sidecar '.idx' file, so, the replayer only needs to read from the last checkpoint before a
+given time.
+
+Note: only values supported by marshal may be recorded (i.e.: int/float/str/bytes/tuple/list/
+dict/set...).
+'''
+import marshal
+import mmap
+import os
+import struct
+import threading
+import weakref
+from bisect import bisect_right
+from collections import deque
+from time import time
+
+from pyvmmonitor_core import compat
+from pyvmmonitor_core.lazy_loading import load_token
+from pyvmmonitor_core.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Record types.
+_KEY = 1  # payload: (key index, key)
+_TRACK = 2  # payload: (class path, ((key index, val), ...))
+_UNTRACK = 3  # payload: None
+_CHANGE = 4  # payload: ((key index, new val), ...)
+_CHECKPOINT = 5  # payload: (keys, ((obj id, class path, ((key index, val), ...)), ...))
+
+# Only used internally to wait for the pending records to be written.
+_FLUSH = 6
+
+# record type, time, obj id, payload size
+_HEADER = struct.Struct('<BdII')
+
+# time, offset
+_INDEX_ENTRY = struct.Struct('<dQ')
+
+_INITIAL_SIZE = 1024 * 1024
+
+
+def get_index_path(path):
+    return path + '.idx'
+
+
+def _get_class_path(cls):
+    return '%s.%s' % (cls.__module__, cls.__name__)
+
+
+class PropsJournalRecorder(object):
+
+    def __init__(self, path, checkpoint_interval=10000, max_batch=1000, flush_interval=.5):
+        '''
+        :param str path:
+            The file where the records should be written (the index is written to path + '.idx').
+
+        :param int checkpoint_interval:
+            The number of changes between checkpoints.
+
+        :param int max_batch:
+            When this number of records is pending, the writer thread is awakened.
+
+        :param float flush_interval:
+            The maximum time (in seconds) the writer thread waits before writing pending records.
+        '''
+        self._path = path
+        self._checkpoint_interval = checkpoint_interval
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval
+
+        self._obj_to_id = weakref.WeakKeyDictionary()
+        self._next_id = 0
+
+        self._pending = deque()
+        self._batch_ready = threading.Event()
+        self._closed = False
+
+        # Only accessed in the writer thread.
+        self._file = open(path, 'w+b')
+        self._file.truncate(_INITIAL_SIZE)
+        self._mmap = mmap.mmap(self._file.fileno(), _INITIAL_SIZE)
+        self._offset = 0
+        self._index_file = open(get_index_path(path), 'wb')
+        self._key_to_index = {}
+        self._keys = []
+        self._id_to_state = {}  # obj id -> (class path, dict(key index->val))
+        self._changes_since_checkpoint = 0
+
+        self._thread = threading.Thread(target=self._write_loop, name='PropsJournalRecorder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def track(self, props_obj):
+        '''
+        Starts recording the changes of the given object.
+
+        :return int:
+            The id of the object in the journal.
+        '''
+        obj_id = self._obj_to_id.get(props_obj)
+        if obj_id is not None:
+            return obj_id
+
+        obj_id = self._obj_to_id[props_obj] = self._next_id
+        self._next_id += 1
+        self._pending.append((_TRACK, time(), obj_id, (
+            _get_class_path(props_obj.__class__), props_obj.create_memento())))
+        props_obj.register_modified(self._on_modified)
+        return obj_id
+
+    def untrack(self, props_obj):
+        obj_id = self._obj_to_id.pop(props_obj, None)
+        if obj_id is not None:
+            props_obj.unregister_modified(self._on_modified)
+            self._pending.append((_UNTRACK, time(), obj_id, None))
+
+    def _on_modified(self, obj, attrs):
+        obj_id = self._obj_to_id.get(obj)
+        if obj_id is not None:
+            pending = self._pending
+            pending.append((_CHANGE, time(), obj_id, attrs))
+            if len(pending) >= self._max_batch:
+                self._batch_ready.set()
+
+    def flush(self):
+        '''
+        Waits until all the pending records are written.
+        '''
+        if not self._thread.is_alive():
+            return
+        written = threading.Event()
+        self._pending.append((_FLUSH, 0, 0, written))
+        self._batch_ready.set()
+        written.wait()
+
+    def close(self):
+        '''
+        Writes all the pending records and closes the files.
+        '''
+        if not self._closed:
+            self._closed = True
+            self._batch_ready.set()
+            self._thread.join()
+
+    # Everything below is only called in the writer thread.
+
+    def _write_loop(self):
+        pending = self._pending
+        batch_ready = self._batch_ready
+        try:
+            while True:
+                batch_ready.wait(self._flush_interval)
+                batch_ready.clear()
+                # Note: check it before writing so that anything added before it's closed is
+                # written.
+                closed = self._closed
+                while pending:
+                    self._write_pending(pending.popleft())
+                if closed:
+                    break
+        finally:
+            self._mmap.flush()
+            self._mmap.close()
+            self._file.truncate(self._offset)
+            self._file.close()
+            self._index_file.close()
+
+    def _write_pending(self, record):
+        record_type, record_time, obj_id, payload = record
+
+        if record_type == _CHANGE:
+            state = self._id_to_state.get(obj_id)
+            if state is None:
+                return  # Changed after being untracked (notification given after untrack).
+            state = state[1]
+            changes = []
+            for key, (new_val, _old_val) in compat.iteritems(payload):
+                key_index = self._get_key_index(key, record_time)
+                changes.append((key_index, new_val))
+                state[key_index] = new_val
+            self._write_record(_CHANGE, record_time, obj_id, tuple(changes))
+
+            self._changes_since_checkpoint += 1
+            if self._changes_since_checkpoint >= self._checkpoint_interval:
+                self._write_checkpoint(record_time)
+
+        elif record_type == _TRACK:
+            class_path, memento = payload
+            state = {}
+            for key, val in compat.iteritems(memento):
+                state[self._get_key_index(key, record_time)] = val
+            self._id_to_state[obj_id] = (class_path, state)
+            self._write_record(
+                _TRACK, record_time, obj_id, (class_path, tuple(compat.iteritems(state))))
+
+        elif record_type == _UNTRACK:
+            self._id_to_state.pop(obj_id, None)
+            self._write_record(_UNTRACK, record_time, obj_id, None)
+
+        elif record_type == _FLUSH:
+            self._mmap.flush()
+            self._index_file.flush()
+            payload.set()
+
+    def _get_key_index(self, key, record_time):
+        key_index = self._key_to_index.get(key)
+        if key_index is None:
+            key_index = self._key_to_index[key] = len(self._keys)
+            self._keys.append(key)
+            self._write_record(_KEY, record_time, 0, (key_index, key))
+        return key_index
+
+    def _write_checkpoint(self, record_time):
+        self._changes_since_checkpoint = 0
+        objects = tuple(
+            (obj_id, class_path, tuple(compat.iteritems(state)))
+            for obj_id, (class_path, state) in compat.iteritems(self._id_to_state))
+
+        offset = self._offset
+        if self._write_record(_CHECKPOINT, record_time, 0, (tuple(self._keys), objects)):
+            self._index_file.write(_INDEX_ENTRY.pack(record_time, offset))
+
+    def _write_record(self, record_type, record_time, obj_id, payload):
+        '''
+        :return bool:
+            Whether the record was written.
+        '''
+        try:
+            data = marshal.dumps(payload)
+        except ValueError:
+            logger.exception('Unable to record: %r (values must be supported by marshal).', payload)
+            return False
+
+        offset = self._offset
+        end = offset + _HEADER.size + len(data)
+        if end > len(self._mmap):
+            self._grow(end)
+
+        mm = self._mmap
+        _HEADER.pack_into(mm, offset, record_type, record_time, obj_id, len(data))
+        mm[offset + _HEADER.size:end] = data
+        self._offset = end
+        return True
+
+    def _grow(self, min_size):
+        size = len(self._mmap)
+        while size < min_size:
+            size *= 2
+        self._mmap.flush()
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+
+class PropsJournalReplayer(object):
+
+    def __init__(self, path):
+        '''
+        :param str path:
+            The file written by a PropsJournalRecorder.
+        '''
+        self._file = open(path, 'rb')
+        size = os.path.getsize(path)
+        if size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mmap = b''
+
+        self._checkpoint_times = []
+        self._checkpoint_offsets = []
+        with open(get_index_path(path), 'rb') as stream:
+            index = stream.read()
+        for i in compat.xrange(0, len(index) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size):
+            checkpoint_time, offset = _INDEX_ENTRY.unpack_from(index, i)
+            self._checkpoint_times.append(checkpoint_time)
+            self._checkpoint_offsets.append(offset)
+
+    def close(self):
+        if not isinstance(self._mmap, bytes):
+            self._mmap.close()
+        self._file.close()
+
+    def _iter_records(self, offset):
+        mm = self._mmap
+        size = len(mm)
+        header_size = _HEADER.size
+        while offset + header_size <= size:
+            record_type, record_time, obj_id, payload_size = _HEADER.unpack_from(mm, offset)
+            if record_type == 0:
+                break  # The end of a file which is still being written.
+            start = offset + header_size
+            offset = start + payload_size
+            yield record_type, record_time, obj_id, marshal.loads(mm[start:offset])
+
+    def get_states(self, at_time=None):
+        '''
+        :param float at_time:
+            The time for which the states should be gotten (if None, the states at the end of
+            the journal are gotten).
+
+        :return dict(int->tuple(str,dict(str->object))):
+            A dict(obj id->(class path, dict(key->val))) with the objects tracked at the given
+            time (note: only the props which were set are available).
+        '''
+        keys = []
+        id_to_state = {}
+        offset = 0
+
+        if at_time is None:
+            i = len(self._checkpoint_times) - 1
+        else:
+            i = bisect_right(self._checkpoint_times, at_time) - 1
+        if i >= 0:
+            offset = self._checkpoint_offsets[i]
+
+        for record_type, record_time, obj_id, payload in self._iter_records(offset):
+            if at_time is not None and record_time > at_time:
+                break
+
+            if record_type == _CHANGE:
+                state = id_to_state[obj_id][1]
+                for key_index, val in payload:
+                    state[keys[key_index]] = val
+
+            elif record_type == _KEY:
+                key_index, key = payload
+                assert key_index == len(keys)
+                keys.append(key)
+
+            elif record_type == _TRACK:
+                class_path, state = payload
+                id_to_state[obj_id] = (
+                    class_path, dict((keys[key_index], val) for key_index, val in state))
+
+            elif record_type == _UNTRACK:
+                id_to_state.pop(obj_id, None)
+
+            elif record_type == _CHECKPOINT:
+                checkpoint_keys, objects = payload
+                keys = list(checkpoint_keys)
+                id_to_state = {}
+                for checkpoint_obj_id, class_path, state in objects:
+                    id_to_state[checkpoint_obj_id] = (
+                        class_path, dict((keys[key_index], val) for key_index, val in state))
+
+        return id_to_state
+
+    def create_objects(self, at_time=None):
+        '''
+        :return dict(int->PropsObject):
+            A dict(obj id->object) with new objects with the state at the given time (note: the
+            classes must be importable and __init__ isn't called for the created objects).
+        '''
+        ret = {}
+        for obj_id, (class_path, state) in compat.iteritems(self.get_states(at_time)):
+            cls = load_token(class_path)
+            obj = cls.__new__(cls)
+            obj.__setstate__(state)
+            ret[obj_id] = obj
+        return ret
@@ -0,0 +1,233 @@
+'''
+License: LGPL
+
+Copyright: Brainwy Software
+
+An undo/redo journal for PropsObjects which keeps only the changes done (as opposed to keeping
+mementos with all the props of the objects).
+
+To use:
+
+journal = PropsUndoJournal()
+journal.track(point1)
+journal.track(point2)
+
+with journal.step():  # All the changes in the step are undone/redone together.
+    point1.x = 10
+    point2.x = 20
+
+point1.y = 30  # Changes done outside of a step are a step on their own.
+
+journal.undo()  # point1.y is restored
+journal.undo()  # point1.x and point2.x are restored
+journal.redo()
+
+Note: changes are gotten from the modified notifications of the tracked objects and the
+changes of a step are applied in a props.transaction (so, each object is notified only once --
+if a transaction is already active, the notifications are only given when it finishes).
+'''
+import weakref
+from array import array
+from contextlib import contextmanager
+
+from pyvmmonitor_core import compat
+from pyvmmonitor_core.props import transaction
+
+_NOT_REPLAYED = object()
+
+
+class PropsUndoJournal(object):
+
+    def __init__(self):
+        self._objects = []  # index -> weakref to obj
+        self._obj_id_to_index = {}
+        self._keys = []  # index -> prop name
+        self._key_to_index = {}
+        self._class_to_props_names = {}
+
+        # Each change is kept in the same index of the arrays/lists below.
+        self._obj_indexes = array('I')
+        self._key_indexes = array('I')
+        self._old_vals = []
+        self._new_vals = []
+
+        # The index of the first change of each step.
+        self._step_starts = array('I')
+
+        # The number of steps applied (steps after it are available for redo).
+        self._current_step = 0
+
+        self._step_level = 0
+        self._step_started = False
+
+        # (id(obj), key) -> value set in an undo/redo whose notification wasn't received yet
+        # (notifications of those values must not be recorded as new changes).
+        self._replayed = {}
+
+    def track(self, obj):
+        obj.register_modified(self._on_modified)
+
+    def untrack(self, obj):
+        obj.unregister_modified(self._on_modified)
+
+    @contextmanager
+    def step(self):
+        '''
+        All the changes done in the context are grouped in a single step.
+        '''
+        self._step_level += 1
+        try:
+            yield
+        finally:
+            self._step_level -= 1
+            if self._step_level == 0:
+                self._step_started = False
+
+    def _get_obj_index(self, obj):
+        obj_id = id(obj)
+        index = self._obj_id_to_index.get(obj_id)
+        if index is None or self._objects[index]() is not obj:
+            index = self._obj_id_to_index[obj_id] = len(self._objects)
+            self._objects.append(weakref.ref(obj))
+        return index
+
+    def _get_key_index(self, key):
+        index = self._key_to_index.get(key)
+        if index is None:
+            index = self._key_to_index[key] = len(self._keys)
+            self._keys.append(key)
+        return index
+
+    def _get_props_names(self, obj):
+        cls = obj.__class__
+        props_names = self._class_to_props_names.get(cls)
+        if props_names is None:
+            # Computed props aren't recorded (they're restored along with the props they
+            # depend on).
+            props_names = self._class_to_props_names[cls] = cls.get_all_props_names()
+        return props_names
+
+    def _on_modified(self, obj, attrs):
+        props_names = self._get_props_names(obj)
+        changes = [(key, new_val, old_val) for key, (new_val, old_val) in compat.iteritems(attrs)
+                   if key in props_names]
+
+        replayed = self._replayed
+        if replayed:
+            obj_id = id(obj)
+            not_replayed = []
+            for key, new_val, old_val in changes:
+                replayed_val = replayed.get((obj_id, key), _NOT_REPLAYED)
+                if replayed_val is not _NOT_REPLAYED:
+                    if replayed_val is new_val:
+                        continue
+                    # Changed again after being replayed (in the same transaction).
+                    old_val = replayed_val
+                not_replayed.append((key, new_val, old_val))
+            changes = not_replayed
+
+        if not changes:
+            return
+
+        if self._current_step < len(self._step_starts):
+            # Something changed after an undo: discard what could be redone.
+            self._truncate(self._current_step)
+
+        if not self._step_started:
+            self._step_starts.append(len(self._old_vals))
+            self._current_step += 1
+            if self._step_level > 0:
+                self._step_started = True
+
+        obj_index = self._get_obj_index(obj)
+        for key, new_val, old_val in changes:
+            self._obj_indexes.append(obj_index)
+            self._key_indexes.append(self._get_key_index(key))
+            self._old_vals.append(old_val)
+            self._new_vals.append(new_val)
+
+    def _truncate(self, step):
+        start = self._step_starts[step]
+        del self._step_starts[step:]
+        del self._obj_indexes[start:]
+        del self._key_indexes[start:]
+        del self._old_vals[start:]
+        del self._new_vals[start:]
+
+    def _get_step_range(self, step):
+        start = self._step_starts[step]
+        if step + 1 < len(self._step_starts):
+            end = self._step_starts[step + 1]
+        else:
+            end = len(self._old_vals)
+        return start, end
+
+    def _apply(self, indexes, vals):
+        objects = self._objects
+        keys = self._keys
+        obj_indexes = self._obj_indexes
+        key_indexes = self._key_indexes
+        replayed = self._replayed
+
+        # Note: if a transaction is already active, the notifications are only given when it
+        # finishes (the values replayed are kept until then).
+        with transaction(on_aggregated=self._on_applied):
+            for i in indexes:
+                obj = objects[obj_indexes[i]]()
+                if obj is not None:
+                    key = keys[key_indexes[i]]
+                    setattr(obj, key, vals[i])
+                    # Note: get the value kept in the object (it may be converted when set).
+                    replayed[(id(obj), key)] = getattr(obj, key)
+
+    def _on_applied(self, aggregated):
+        # Called after the notifications of the replayed changes were given.
+        self._replayed.clear()
+
+    def can_undo(self):
+        return self._current_step > 0
+
+    def can_redo(self):
+        return self._current_step < len(self._step_starts)
+
+    def undo(self):
+        '''
+        :return bool:
+            Whether some step was undone.
+        '''
+        if not self.can_undo():
+            return False
+        step = self._current_step - 1
+        start, end = self._get_step_range(step)
+        self._apply(compat.xrange(end - 1, start - 1, -1), self._old_vals)
+        self._current_step = step
+        return True
+
+    def redo(self):
+        '''
+        :return bool:
+            Whether some step was redone.
+        '''
+        if not self.can_redo():
+            return False
+        step = self._current_step
+        start, end = self._get_step_range(step)
+        self._apply(compat.xrange(start, end), self._new_vals)
+        self._current_step = step + 1
+        return True
+
+    def clear(self):
+        if self._step_starts:
+            self._truncate(0)
+        self._current_step = 0
+        del self._objects[:]
+        self._obj_id_to_index.clear()
+        del self._keys[:]
+        self._key_to_index.clear()
+
+    def __len__(self):
+        '''
+        :return int:
+            The number of steps in the journal (including the ones which can be redone).
+        '''
+        return len(self._step_starts)